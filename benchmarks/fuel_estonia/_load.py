@@ -0,0 +1,24 @@
+"""Load integration modules that do not depend on Home Assistant.
+
+The package ``__init__`` imports Home Assistant, so benchmarks import the
+pure helper modules straight from their files instead.
+"""
+from __future__ import annotations
+
+import importlib.util
+from pathlib import Path
+import sys
+
+COMPONENT_DIR = Path(__file__).resolve().parents[2] / "custom_components" / "fuel_estonia"
+
+
+def load(name: str):
+    """Import ``custom_components/fuel_estonia/<name>.py`` as a top-level module."""
+    mod_name = f"fuel_estonia_{name}"
+    if mod_name in sys.modules:
+        return sys.modules[mod_name]
+    spec = importlib.util.spec_from_file_location(mod_name, COMPONENT_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[mod_name] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,39 @@
+"""Retained memory of one normalized snapshot at 1k and 10k stations.
+
+Run with ``python benchmarks/fuel_estonia/bench_memory.py``. The payload is
+decoded inside the measurement and dropped, so only what the snapshot keeps
+alive is counted.
+"""
+from __future__ import annotations
+
+import gc
+import json
+import tracemalloc
+
+from _load import load
+from feedgen import generate
+
+snapshot = load("snapshot")
+
+
+def retained_mib(stations: int) -> tuple[float, int]:
+    body = json.dumps(generate(stations))
+    parser = snapshot.SnapshotParser()
+    parser.parse(json.loads(body))  # detect the schema outside the measurement
+    gc.collect()
+    tracemalloc.start()
+    result = parser.parse(json.loads(body))
+    gc.collect()
+    current, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / 1024 / 1024, len(result)
+
+
+def main() -> None:
+    for stations in (1_000, 10_000):
+        mib, prices = retained_mib(stations)
+        print(f"{stations:>6} stations, {prices:>6} prices: snapshot {mib:6.2f} MiB ({mib * 1024 * 1024 / prices:5.0f} B/price)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""Compare generic payload extraction with the schema-compiled extractor.
+
+Timing only; the parsers and ``diff_snapshots`` are checked by
+``tests/fuel_estonia/test_snapshot.py``.
+Run with ``python benchmarks/fuel_estonia/bench_parse.py``.
+"""
+from __future__ import annotations
+
+import timeit
+
+from _load import load
+from feedgen import generate
+
+snapshot = load("snapshot")
+
+
+def main() -> None:
+    for stations in (100, 1_000, 10_000):
+        payload = generate(stations)
+        parser = snapshot.SnapshotParser()
+        parser.parse(payload)  # first refresh runs detection
+
+        runs = max(3, 20_000 // stations)
+        generic = min(timeit.repeat(lambda: snapshot.build_snapshot(payload), number=runs, repeat=3)) / runs
+        compiled = min(timeit.repeat(lambda: parser.parse(payload), number=runs, repeat=3)) / runs
+        print(
+            f"{stations:>6} stations: generic {generic * 1e3:8.3f} ms  "
+            f"compiled {compiled * 1e3:8.3f} ms  ({(1 - compiled / generic) * 100:5.1f}% faster)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Peak memory and CPU time of decoding the whole feed versus the streaming parser.
+
+Run with ``python benchmarks/fuel_estonia/bench_streaming.py``.
+"""
+from __future__ import annotations
+
+import json
+import timeit
+import tracemalloc
+
+from _load import load
+from feedgen import generate
+
+snapshot = load("snapshot")
+
+
+def _measure(func, body: bytes) -> tuple[float, float]:
+    """Return (peak MiB, retained snapshot MiB) for one parse."""
+    tracemalloc.start()
+    result = func(body)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 1024 / 1024, retained / 1024 / 1024
+
+
+def main() -> None:
+    parser = snapshot.SnapshotParser()
+    for stations in (1_000, 10_000):
+        body = json.dumps(generate(stations)).encode()
+        decoded = _measure(lambda b: parser.parse(json.loads(b)), body)
+        streamed = _measure(snapshot.build_snapshot_streaming, body)
+        runs = max(3, 20_000 // stations)
+        decoded_s = min(timeit.repeat(lambda: parser.parse(json.loads(body)), number=runs, repeat=3)) / runs
+        streamed_s = min(timeit.repeat(lambda: snapshot.build_snapshot_streaming(body), number=runs, repeat=3)) / runs
+        print(
+            f"{stations:>6} stations ({len(body) / 1024:7.0f} KiB body): "
+            f"json.loads peak {decoded[0]:6.1f} MiB / {decoded_s * 1e3:6.1f} ms, "
+            f"streaming peak {streamed[0]:6.1f} MiB / {streamed_s * 1e3:6.1f} ms "
+            f"(snapshot itself {streamed[1]:6.1f} MiB)"
+        )
+
+
+if __name__ == "__main__":
+    main()
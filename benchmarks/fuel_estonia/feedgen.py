@@ -0,0 +1,78 @@
+"""Synthetic fuelest.ee-shaped payloads for benchmarks.
+
+Each variant uses one of the key spellings ``snapshot.py`` accepts:
+
+``priceInfo``  ``{"priceInfo": [{"stationInfos": [{"fuelInfos": ...}]}]}`` (live feed)
+``Companies``  ``{"Companies": [{"Stations": [{"Fuels": ...}]}]}``
+``data``       ``{"data": {"companies": [{"stations": [{"fuels": ...}]}]}}``
+``flat``       ``[{"stationId": ..., "Prices": ...}]`` (stations, no companies)
+"""
+from __future__ import annotations
+
+import random
+
+FUEL_TYPES = {1: "95", 2: "98", 3: "Diesel", 4: "LPG", 5: "CNG"}
+
+VARIANTS = ("priceInfo", "Companies", "data", "flat")
+
+# key names per variant: companies, stations, station id/name/lat/lon, fuels, fuel id/name/price
+_KEYS = {
+    "priceInfo": ("priceInfo", "stationInfos", "id", "displayName", "latitude", "longitude", "fuelInfos", "fuelTypeId", "name", "price"),
+    "Companies": ("Companies", "Stations", "Id", "DisplayName", "Latitude", "Longitude", "Fuels", "FuelTypeId", "FuelTypeName", "Price"),
+    "data": ("companies", "stations", "id", "Name", "lat", "lng", "fuels", "fuelType", "FuelName", "price"),
+    "flat": (None, None, "stationId", "displayname", "Lat", "Lon", "Prices", "FuelType", "Name", "Price"),
+}
+
+
+def generate(stations: int, companies: int = 20, seed: int = 0, variant: str = "priceInfo") -> dict | list:
+    """Return a payload with ``stations`` stations spread over ``companies``.
+
+    Roughly 80% of the fuel types are sold at each station, with prices
+    between 1.40 and 2.00 EUR and coordinates inside Estonia.
+    """
+    comps_key, stations_key, sid_key, name_key, lat_key, lon_key, fuels_key, fid_key, fname_key, price_key = _KEYS[variant]
+    rng = random.Random(seed)
+    station_list = []
+    for sid in range(1, stations + 1):
+        fuels = [
+            {fid_key: fid, fname_key: fname, price_key: round(rng.uniform(1.4, 2.0), 3)}
+            for fid, fname in FUEL_TYPES.items()
+            if rng.random() < 0.8
+        ]
+        station_list.append(
+            {
+                sid_key: sid,
+                name_key: f"Station {sid}",
+                lat_key: round(rng.uniform(57.5, 59.7), 6),
+                lon_key: round(rng.uniform(21.8, 28.2), 6),
+                fuels_key: fuels,
+            }
+        )
+    if variant == "flat":
+        return station_list
+
+    comps = [{"id": c, "name": f"Company {c}", stations_key: []} for c in range(1, companies + 1)]
+    for station in station_list:
+        comps[station[sid_key] % companies][stations_key].append(station)
+    if variant == "data":
+        return {"data": {comps_key: comps}}
+    return {comps_key: comps}
+
+
+def bump_prices(payload: dict | list, share: float, seed: int = 1) -> int:
+    """Change ``share`` of the prices in place; return how many moved."""
+    rng = random.Random(seed)
+    moved = 0
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key in ("price", "Price") and rng.random() < share:
+                    node[key] = round(value + 0.01, 3)
+                    moved += 1
+                elif isinstance(value, (list, dict)):
+                    stack.append(value)
+    return moved
@@ -0,0 +1,251 @@
+"""Offline benchmark suite for the fuel_estonia integration.
+
+Times the refresh pipeline on synthetic feeds (see ``feedgen.py``) in every
+payload variant at 100, 1k and 10k stations and writes the results as JSON:
+
+    python benchmarks/fuel_estonia/run.py --output bench.json
+    python benchmarks/fuel_estonia/run.py --compare bench.json
+
+Payload extraction, diffing and the query helpers only need the standard
+library; the streaming parser case needs ``ijson`` and is skipped without
+it. Entity construction in ``sensor.async_setup_entry``, the
+fuel-type device sync and the ``_handle_coordinator_update`` fan-out need Home Assistant and ``pytest-homeassistant-custom-component``.
+They are skipped (and listed as skipped in the output) when those are
+not installed.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from datetime import timedelta
+import json
+import logging
+import platform
+from pathlib import Path
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+from _load import COMPONENT_DIR, load
+from feedgen import VARIANTS, bump_prices, generate
+
+SIZES = (100, 1_000, 10_000)
+
+
+def _timed(func: Callable[[], Any], runs: int) -> dict[str, Any]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return {"runs": runs, "min_s": min(samples), "median_s": statistics.median(samples)}
+
+
+def _runs(stations: int) -> int:
+    return max(3, min(50, 20_000 // stations))
+
+
+def bench_pure(sizes: tuple[int, ...], results: list[dict[str, Any]], skipped: list[str]) -> None:
+    snapshot = load("snapshot")
+    try:
+        import ijson  # noqa: F401
+
+        streaming = True
+    except ImportError as err:
+        streaming = False
+        skipped.append(f"extract_streaming: {err}")
+    aggregates = load("aggregates")
+    history = load("history")
+    spatial = load("spatial")
+
+    for variant in VARIANTS:
+        for stations in sizes:
+            payload = generate(stations, variant=variant)
+            body = json.dumps(payload).encode()
+            runs = _runs(stations)
+            parser = snapshot.SnapshotParser()
+            parser.parse(payload)
+            base = {"variant": variant, "stations": stations}
+
+            results.append({"name": "extract_generic", **base, **_timed(lambda: snapshot.build_snapshot(payload), runs)})
+            results.append({"name": "extract_compiled", **base, **_timed(lambda: parser.parse(payload), runs)})
+            if streaming:
+                results.append({"name": "extract_streaming", **base, **_timed(lambda: snapshot.build_snapshot_streaming(body), runs)})
+
+            if variant != "priceInfo":
+                continue
+            old = parser.parse(payload)
+            bump_prices(payload, 0.02)
+            new = parser.parse(payload)
+            results.append({"name": "diff_2pct", **base, **_timed(lambda: snapshot.diff_snapshots(old, new), runs)})
+
+            diff = snapshot.diff_snapshots(old, new)
+
+            def _aggregates():
+                agg = aggregates.FuelAggregates()
+                agg.rebuild(old)
+                agg.update(new, diff)
+
+            results.append({"name": "aggregates_rebuild_and_patch", **base, **_timed(_aggregates, runs)})
+            results.append(
+                {"name": "history_record", **base, **_timed(lambda: history.PriceHistory(16).record(0.0, diff, new), runs)}
+            )
+
+            def _hourly():
+                hourly = history.HourlyPrices()
+                hourly.observe(0.0, old, snapshot.diff_snapshots(None, old))
+                hourly.observe(1800.0, new, diff)
+                hourly.observe(3600.0, new, snapshot.PriceDiff())
+
+            results.append({"name": "hourly_prices_hour", **base, **_timed(_hourly, runs)})
+            grid = spatial.StationGrid.build(new.stations.values())
+            results.append({"name": "grid_build", **base, **_timed(lambda: spatial.StationGrid.build(new.stations.values()), runs)})
+            results.append(
+                {
+                    "name": "find_cheapest_15km",
+                    **base,
+                    **_timed(lambda: spatial.cheapest_within(new, grid, "3", 59.437, 24.7536, 15, 5), runs),
+                }
+            )
+
+
+class _QueuedFetcher:
+    """Hands the coordinator pre-built snapshots instead of hitting the network."""
+
+    def __init__(self) -> None:
+        self.queue: list[Any] = []
+        self.last_fetch_failed = False
+
+    async def async_fetch(self, max_age: float = 0):
+        return self.queue.pop(0)
+
+
+async def bench_homeassistant(sizes: tuple[int, ...], results: list[dict[str, Any]]) -> None:
+    from pytest_homeassistant_custom_component.common import MockConfigEntry, async_test_home_assistant
+
+    from homeassistant.helpers.entity_platform import EntityPlatform
+
+    sys.path.insert(0, str(COMPONENT_DIR.parents[1]))
+    from custom_components.fuel_estonia import sensor as sensor_platform
+    from custom_components.fuel_estonia.const import DOMAIN
+    from custom_components.fuel_estonia.coordinator import FuelEstoniaCoordinator
+    from custom_components.fuel_estonia.devices import FuelTypeDeviceSync
+    from custom_components.fuel_estonia.snapshot import SnapshotParser
+
+    async with async_test_home_assistant() as hass:
+        for stations in sizes:
+            payload = generate(stations)
+            parser = SnapshotParser()
+            snapshot = parser.parse(payload)
+            bump_prices(payload, 1.0)
+            all_changed = parser.parse(payload)
+            bump_prices(payload, 0.02, seed=2)
+            some_changed = parser.parse(payload)
+            base = {"variant": "priceInfo", "stations": stations}
+
+            entry = MockConfigEntry(domain=DOMAIN, data={}, options={})
+            entry.add_to_hass(hass)
+            fetcher = _QueuedFetcher()
+            coordinator = FuelEstoniaCoordinator(hass, entry, fetcher, 300)
+            coordinator.data = snapshot
+            coordinator.aggregates.rebuild(snapshot)
+            hass.data.setdefault(DOMAIN, {})[entry.entry_id] = {"coordinator": coordinator}
+
+            entities: list[Any] = []
+            start = time.perf_counter()
+            await sensor_platform.async_setup_entry(hass, entry, lambda new, _update=False: entities.extend(new))
+            elapsed = time.perf_counter() - start
+            results.append({"name": "entity_construction", **base, "runs": 1, "min_s": elapsed, "median_s": elapsed})
+
+            device_sync = FuelTypeDeviceSync(hass, entry)
+            start = time.perf_counter()
+            device_sync.async_sync(snapshot)
+            elapsed = time.perf_counter() - start
+            results.append({"name": "create_devices", **base, "runs": 1, "min_s": elapsed, "median_s": elapsed})
+            results.append({"name": "sync_devices_unchanged", **base, **_timed(lambda: device_sync.async_sync(all_changed), _runs(stations))})
+
+            platform_ = EntityPlatform(
+                hass=hass,
+                logger=logging.getLogger(__name__),
+                domain="sensor",
+                platform_name=DOMAIN,
+                platform=None,
+                scan_interval=timedelta(seconds=300),
+                entity_namespace=None,
+            )
+            platform_.config_entry = entry
+            for entity in entities:
+                entity._attr_entity_registry_enabled_default = True
+            await platform_.async_add_entities(entities)
+
+            for name, new in (("fanout_all_changed", all_changed), ("fanout_2pct_changed", some_changed)):
+                fetcher.queue.append(new)
+                start = time.perf_counter()
+                await coordinator.async_refresh()
+                elapsed = time.perf_counter() - start
+                results.append({"name": name, **base, "runs": 1, "min_s": elapsed, "median_s": elapsed})
+
+            await platform_.async_reset()
+            await hass.config_entries.async_remove(entry.entry_id)
+
+
+def compare(current: list[dict[str, Any]], baseline_path: Path, threshold: float, floor: float) -> int:
+    """Print cases that got slower than ``threshold``; return their count.
+
+    Cases whose baseline is under ``floor`` seconds are too noisy to judge.
+    """
+    baseline = json.loads(baseline_path.read_text())
+    previous = {(r["name"], r["variant"], r["stations"]): r for r in baseline["results"]}
+    regressions = 0
+    for result in current:
+        old = previous.get((result["name"], result["variant"], result["stations"]))
+        if old is None or old["min_s"] < floor:
+            continue
+        ratio = result["min_s"] / old["min_s"] - 1
+        if ratio > threshold:
+            regressions += 1
+            print(f"REGRESSION {result['name']} {result['variant']} {result['stations']}: {ratio * 100:+.1f}%")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--compare", type=Path, help="earlier results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging (0.10 = 10%%)")
+    parser.add_argument("--floor", type=float, default=1e-3, help="ignore cases faster than this many seconds when comparing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    args = parser.parse_args()
+    sizes = tuple(args.sizes)
+
+    results: list[dict[str, Any]] = []
+    skipped: list[str] = []
+    bench_pure(sizes, results, skipped)
+    try:
+        asyncio.run(bench_homeassistant(sizes, results))
+    except ImportError as err:
+        skipped.append(f"homeassistant benchmarks: {err}")
+
+    for result in results:
+        print(f"{result['name']:<30} {result['variant']:<10} {result['stations']:>6}  {result['min_s'] * 1e3:10.3f} ms")
+    for reason in skipped:
+        print(f"skipped {reason}")
+
+    args.output.write_text(
+        json.dumps(
+            {
+                "meta": {"python": platform.python_version(), "machine": platform.machine(), "timestamp": time.time()},
+                "skipped": skipped,
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold, args.floor) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
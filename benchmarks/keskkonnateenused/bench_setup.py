@@ -0,0 +1,70 @@
+"""Startup latency of a keskkonnateenused config entry against a slow API.
+
+Run with ``python benchmarks/keskkonnateenused/bench_setup.py``. Needs Home
+Assistant and ``pytest-homeassistant-custom-component``. For each API
+delay it reports how long ``async_setup`` of the entry blocked and how long
+until the sensors had a state. Run it on an older checkout to get the
+numbers to compare against.
+"""
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+import sys
+import time
+
+REPO = Path(__file__).resolve().parents[2]
+DELAYS = (0.1, 2.0, 8.0)
+# give up on sensors appearing after this long
+READY_TIMEOUT = 60.0
+PAYLOAD = [
+    {"garbage": "Glass", "date": "2030-01-10"},
+    {"garbage": "Paper", "date": "2030-01-12"},
+    {"garbage": "Glass", "date": "2030-02-10"},
+]
+
+
+async def _measure(delay: float) -> tuple[float, float]:
+    from pytest_homeassistant_custom_component.common import MockConfigEntry, async_test_home_assistant
+    from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMockResponse, mock_aiohttp_client
+
+    from homeassistant import loader
+
+    sys.path.insert(0, str(REPO))
+    from custom_components.keskkonnateenused.const import BASE_API, DOMAIN
+
+    async def _slow_api(method, url, data):
+        await asyncio.sleep(delay)
+        return AiohttpClientMockResponse(method, url, json=PAYLOAD)
+
+    async with async_test_home_assistant() as hass:
+        hass.config.components.add("http")
+        # what the enable_custom_integrations fixture does: let the loader
+        # find this repository's custom_components package
+        hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+        with mock_aiohttp_client() as aioclient_mock:
+            aioclient_mock.get(f"{BASE_API}123", side_effect=_slow_api)
+            entry = MockConfigEntry(domain=DOMAIN, data={"contract_number": "123", "address": "Bench 1"}, options={})
+            entry.add_to_hass(hass)
+
+            start = time.perf_counter()
+            await hass.config_entries.async_setup(entry.entry_id)
+            setup = time.perf_counter() - start
+            while not hass.states.async_entity_ids("sensor"):
+                if time.perf_counter() - start > READY_TIMEOUT:
+                    raise RuntimeError(f"no sensors after {READY_TIMEOUT:.0f} s")
+                await asyncio.sleep(0.01)
+            ready = time.perf_counter() - start
+
+            await hass.config_entries.async_unload(entry.entry_id)
+    return setup, ready
+
+
+def main() -> None:
+    for delay in DELAYS:
+        setup, ready = asyncio.run(_measure(delay))
+        print(f"API delay {delay:5.1f} s: setup blocked {setup:6.3f} s, sensors ready after {ready:6.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,104 @@
 from __future__ import annotations
 
-from datetime import timedelta
+import asyncio
+from importlib.util import find_spec
 import logging
 
-from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+import voluptuous as vol
 
-from .const import DOMAIN, DEFAULT_API, PLATFORMS, UPDATE_INTERVAL
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.storage import Store
+
+from .companies import async_get_company_map
+from .const import (
+    DOMAIN,
+    DEFAULT_API,
+    MAX_CONCURRENT_FETCHES,
+    PLATFORMS,
+    SELECTION_OPTIONS,
+    STORAGE_VERSION,
+    UPDATE_INTERVAL,
+)
+from .coordinator import FuelEstoniaCoordinator
+from .devices import FuelTypeDeviceSync
+from .fetcher import MultiFeedFetcher, async_acquire_fetcher, async_release_fetcher, country_url
+from .spatial import cheapest_within, resolve_fuel_type, zone_location
 
 _LOGGER = logging.getLogger(__name__)
 
+FORCE_REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional("entry_id"): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+FIND_CHEAPEST_SCHEMA = vol.Schema(
+    {
+        vol.Required("fuel_type"): cv.string,
+        vol.Optional("zone"): cv.entity_id,
+        vol.Inclusive("latitude", "coordinates"): cv.latitude,
+        vol.Inclusive("longitude", "coordinates"): cv.longitude,
+        vol.Optional("radius", default=10): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional("count", default=5): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+    }
+)
+
 
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the integration as legacy stub (no-op)."""
     hass.data.setdefault(DOMAIN, {})
-    # Register a lightweight admin service to force a coordinator refresh
-    async def _handle_force_refresh(call):
-        entries = list(hass.data.get(DOMAIN, {}).values())
-        for entry in entries:
-            coordinator = entry.get("coordinator")
-            if coordinator is not None:
-                hass.async_create_task(coordinator.async_refresh())
+    # Admin service to refresh now; reports per-entry fetch results
+    async def _handle_force_refresh(call: ServiceCall) -> ServiceResponse:
+        loaded = hass.data.get(DOMAIN, {})
+        entry_ids = call.data.get("entry_id") or list(loaded)
+        unknown = [entry_id for entry_id in entry_ids if entry_id not in loaded]
+        if unknown:
+            raise HomeAssistantError(f"No loaded {DOMAIN} entries: {', '.join(unknown)}")
+        coordinators = [loaded[entry_id]["coordinator"] for entry_id in entry_ids]
+        reports = await asyncio.gather(*(coordinator.async_force_refresh() for coordinator in coordinators))
+        return {"entries": dict(zip(entry_ids, reports))}
+
+    hass.services.async_register(
+        DOMAIN,
+        "force_refresh",
+        _handle_force_refresh,
+        schema=FORCE_REFRESH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
 
-    hass.services.async_register(DOMAIN, "force_refresh", _handle_force_refresh)
+    async def _handle_find_cheapest(call: ServiceCall) -> ServiceResponse:
+        if "latitude" in call.data:
+            location = (call.data["latitude"], call.data["longitude"])
+        else:
+            location = zone_location(hass, call.data.get("zone"))
+        if location is None:
+            raise HomeAssistantError(f"Zone {call.data.get('zone')} has no location")
+
+        best: dict[str, dict] = {}
+        for entry_data in hass.data.get(DOMAIN, {}).values():
+            coordinator = entry_data.get("coordinator")
+            snapshot = coordinator.data if coordinator is not None else None
+            if not snapshot:
+                continue
+            fuel_type_id = resolve_fuel_type(snapshot, call.data["fuel_type"])
+            if fuel_type_id is None:
+                continue
+            for item in cheapest_within(snapshot, coordinator.grid, fuel_type_id, *location, call.data["radius"], call.data["count"]):
+                best.setdefault(item["station_id"], item)
+
+        stations = sorted(best.values(), key=lambda item: (item["price"], item["distance_km"]))
+        return {"stations": stations[: call.data["count"]]}
+
+    hass.services.async_register(
+        DOMAIN,
+        "find_cheapest",
+        _handle_find_cheapest,
+        schema=FIND_CHEAPEST_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
 
     return True
 
@@ -32,137 +107,85 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up a config entry."""
     hass.data.setdefault(DOMAIN, {})
 
-    _LOGGER.warning("async_setup_entry called for %s", entry.entry_id)
+    _LOGGER.debug("async_setup_entry called for %s", entry.entry_id)
 
-    api_url = entry.data.get("api_url", DEFAULT_API)
+    api_url = entry.options.get("api_url", entry.data.get("api_url", DEFAULT_API))
     update_interval = entry.options.get("update_interval", UPDATE_INTERVAL)
 
-    async def async_fetch_data():
-        _LOGGER.warning("async_fetch_data starting for entry %s", entry.entry_id)
-        import async_timeout
-        from aiohttp import ClientError
-        from homeassistant.helpers.aiohttp_client import async_get_clientsession
-        import asyncio
-
-        session = async_get_clientsession(hass)
-        attempts = 3
-        backoff = 1
-        for attempt in range(1, attempts + 1):
-            _LOGGER.warning("fetch attempt %s for %s", attempt, api_url)
-            try:
-                async with async_timeout.timeout(10):
-                    resp = await session.get(api_url)
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    _LOGGER.warning("fetch success for %s, received %s items", entry.entry_id, (len(data) if hasattr(data, '__len__') else 'unknown'))
-                    return data
-            except ClientError as err:
-                _LOGGER.warning("Attempt %s: HTTP error fetching fuel data: %s", attempt, err)
-            except asyncio.TimeoutError:
-                _LOGGER.warning("Attempt %s: Timeout fetching fuel data", attempt)
-            except Exception:
-                _LOGGER.exception("Attempt %s: Unexpected error fetching fuel data", attempt)
-
-            if attempt < attempts:
-                await asyncio.sleep(backoff)
-                backoff *= 2
-
-        # All attempts failed
-        _LOGGER.error("All attempts to fetch fuel data failed for %s", entry.entry_id)
-        return None
-
-    coordinator = DataUpdateCoordinator(
-        hass,
-        _LOGGER,
-        name=f"{DOMAIN}_{entry.entry_id}",
-        update_method=async_fetch_data,
-        update_interval=timedelta(seconds=update_interval),
-    )
-
-    # store coordinator
-    hass.data[DOMAIN][entry.entry_id] = {"coordinator": coordinator}
-    _LOGGER.warning("stored coordinator for entry %s", entry.entry_id)
-
-    # Create devices for unique fuel types when data becomes available.
-    from homeassistant.helpers import device_registry as dr
-
-    async def _create_devices_from_data() -> None:
-        data = coordinator.data
-        if not data:
-            return
-
-        # extract companies list, support multiple API shapes
-        def _extract_companies(d):
-            if isinstance(d, dict):
-                for k in ("Companies", "companies", "companiesList", "priceInfo", "PriceInfo"):
-                    v = d.get(k)
-                    if isinstance(v, list):
-                        return v
-                # nested under 'data'
-                if isinstance(d.get("data"), dict):
-                    for k in ("priceInfo", "Companies", "companies", "companiesList"):
-                        v = d["data"].get(k)
-                        if isinstance(v, list):
-                            return v
-            if isinstance(d, list):
-                return d
-            return None
-
-        companies = _extract_companies(data)
-        if not companies:
-            return
-
-        registry = dr.async_get(hass)
-        seen = set()
-        _LOGGER.warning("_create_devices_from_data: found %s companies", (len(companies) if hasattr(companies, '__len__') else 'unknown'))
-        for comp in companies:
-            stations = comp.get("Stations") or comp.get("stations") or comp.get("stationInfos") or comp.get("stationinfos")
-            if stations is None and isinstance(comp, dict) and any(k in comp for k in ("Id", "id", "stationId", "DisplayName", "displayName")):
-                stations = [comp]
-            if not stations:
-                continue
-            for station in stations:
-                fuels = station.get("Fuels") or station.get("fuels") or station.get("Prices") or station.get("fuelInfos") or station.get("fuelinfos")
-                if not fuels:
-                    continue
-                for fuel in fuels:
-                    fid = fuel.get("FuelTypeId") or fuel.get("fuelTypeId") or fuel.get("FuelType") or fuel.get("fuelType") or fuel.get("Id") or fuel.get("id")
-                    fname = fuel.get("FuelTypeName") or fuel.get("FuelName") or fuel.get("name") or fuel.get("Name") or str(fid)
-                    if fid is None:
-                        continue
-                    device_identifier = f"fuel_type_{fid}"
-                    if device_identifier in seen:
-                        continue
-                    seen.add(device_identifier)
-                    _LOGGER.warning("Creating device identifier=%s name=%s", device_identifier, fname)
-                    dev = registry.async_get_or_create(
-                        config_entry_id=entry.entry_id,
-                        identifiers={(DOMAIN, device_identifier)},
-                        name=str(fname),
-                        manufacturer="FuelEstonia",
-                    )
-                    _LOGGER.warning("Created device id=%s", getattr(dev, 'id', dev))
-
-    # Try creating devices now and also on future coordinator updates
-    hass.async_create_task(_create_devices_from_data())
-    coordinator.async_add_listener(lambda: hass.async_create_task(_create_devices_from_data()))
-
-    # Schedule the coordinator's initial refresh in the background so data
-    # becomes available and device creation runs without blocking startup.
-    try:
-        hass.async_create_task(coordinator.async_config_entry_first_refresh())
-    except Exception:
-        _LOGGER.exception("Failed scheduling initial refresh for %s", entry.entry_id)
+    streaming = entry.options.get("streaming_parser", False)
+    if streaming and find_spec("ijson") is None:
+        # ijson is optional; it is only needed for this option
+        _LOGGER.warning("streaming_parser is on for %s but ijson is not installed, using the regular parser", entry.entry_id)
+        streaming = False
+
+    # one feed per country, or api_url as it is when none are picked; entries
+    # polling the same url with the same parser share one fetcher and its snapshots
+    country_ids = entry.options.get("country_ids") or []
+    urls = list(dict.fromkeys(country_url(api_url, country_id) for country_id in country_ids)) or [api_url]
+    fetchers = [async_acquire_fetcher(hass, url, streaming=streaming) for url in urls]
+    for part in fetchers:
+        entry.async_on_unload(lambda part=part: async_release_fetcher(hass, part))
+    fetcher = fetchers[0] if len(fetchers) == 1 else MultiFeedFetcher(fetchers, MAX_CONCURRENT_FETCHES)
+    coordinator = FuelEstoniaCoordinator(hass, entry, fetcher, update_interval)
+    coordinator.company_names = await async_get_company_map(hass)
+    # entities come up from the last saved snapshot; the refresh below reconciles
+    await coordinator.async_restore()
+
+    # store coordinator, and the options it was set up with for the update listener
+    hass.data[DOMAIN][entry.entry_id] = {"coordinator": coordinator, "options": dict(entry.options)}
+    _LOGGER.debug("stored coordinator for entry %s", entry.entry_id)
+
+    # Sync fuel type devices now and whenever the snapshot changes
+    device_sync = FuelTypeDeviceSync(hass, entry)
+    device_sync.async_sync(coordinator.data)
+
+    @callback
+    def _sync_devices() -> None:
+        complete = coordinator.last_update_success and not fetcher.last_fetch_failed
+        removed = device_sync.async_sync(coordinator.data, complete)
+        manager = hass.data[DOMAIN].get(entry.entry_id, {}).get("entities")
+        if removed and manager is not None:
+            # their entities went with the devices
+            manager.async_forget_fuel_types(removed)
+
+    entry.async_on_unload(coordinator.async_add_listener(_sync_devices))
+
+    # Refresh in the background so startup does not wait for the feed; a
+    # failure is recorded on the coordinator and retried at the next poll.
+    entry.async_create_background_task(hass, coordinator.async_refresh(), f"{DOMAIN}_{entry.entry_id}_first_refresh")
 
     # forward setup to platforms
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
     return True
 
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply entity selection changes in place; reload for anything else."""
+    entry_data = hass.data[DOMAIN][entry.entry_id]
+    old, new = entry_data["options"], dict(entry.options)
+    changed = {key for key in old.keys() | new.keys() if old.get(key) != new.get(key)}
+    entry_data["options"] = new
+    if not changed:
+        return
+    manager = entry_data.get("entities")
+    if manager is not None and changed <= set(SELECTION_OPTIONS):
+        _LOGGER.debug("Reconciling entities of %s after %s changed", entry.entry_id, sorted(changed))
+        await manager.async_reconcile()
+        return
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id, None)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted snapshot and polling profile when the entry is deleted."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.polling").async_remove()
@@ -0,0 +1,150 @@
+"""Per-fuel-type and per-company price statistics kept up to date from snapshot diffs."""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .snapshot import FuelSnapshot, PriceDiff
+
+# above this share of changed prices a full rebuild is cheaper than patching
+_REBUILD_RATIO = 0.25
+
+
+def company_key(company_id: str, fuel_type_id: str) -> tuple[str, str, str]:
+    """Return the aggregate key of one fuel type at one company."""
+    return ("company", company_id, fuel_type_id)
+
+
+class FuelTypeStats:
+    """Sorted (price, station_id) pairs of one fuel type plus a running sum."""
+
+    __slots__ = ("entries", "total")
+
+    def __init__(self, entries: list[tuple[float, str]] | None = None) -> None:
+        self.entries: list[tuple[float, str]] = entries or []
+        self.total = sum(price for price, _sid in self.entries)
+
+    def remove(self, price: float, station_id: str) -> None:
+        entries = self.entries
+        i = bisect_left(entries, (price, station_id))
+        if i < len(entries) and entries[i] == (price, station_id):
+            del entries[i]
+            self.total -= price
+
+    def add(self, price: float, station_id: str) -> None:
+        insort(self.entries, (price, station_id))
+        self.total += price
+
+    def as_dict(self) -> dict[str, Any] | None:
+        entries = self.entries
+        count = len(entries)
+        if not count:
+            return None
+        mid = count // 2
+        median = entries[mid][0] if count % 2 else (entries[mid - 1][0] + entries[mid][0]) / 2
+        return {
+            "min": entries[0][0],
+            "max": entries[-1][0],
+            "median": median,
+            "mean": self.total / count,
+            "count": count,
+            "min_station_id": entries[0][1],
+        }
+
+
+class FuelAggregates:
+    """Min/max/median/mean per fuel type, and per fuel type at each company.
+
+    Statistics are keyed by fuel type id for the whole feed and by
+    ``company_key(company_id, fuel_type_id)`` per company. ``rebuild``
+    fills both in one pass over the snapshot and sorts each group once.
+    ``update`` patches the sorted lists with a ``PriceDiff`` so a refresh
+    touching a few prices costs a few bisects. ``changed`` holds the keys
+    whose statistics moved in the last update.
+    """
+
+    def __init__(self) -> None:
+        self._groups: dict[Any, FuelTypeStats] = {}
+        self._stats: dict[Any, dict[str, Any] | None] = {}
+        # company each station's prices are grouped under, to find the group
+        # of removed prices and to notice stations that changed company
+        self._company_of: dict[str, str | None] = {}
+        self.changed: set[Any] = set()
+
+    def rebuild(self, snapshot: FuelSnapshot | None) -> None:
+        grouped: dict[Any, list[tuple[float, str]]] = {}
+        company_of: dict[str, str | None] = {}
+        if snapshot is not None:
+            stations = snapshot.stations
+            company_of = {sid: station.company for sid, station in stations.items()}
+            for (sid, fid), price in snapshot.items():
+                if price is None:
+                    continue
+                entry = (price, sid)
+                grouped.setdefault(fid, []).append(entry)
+                company = stations[sid].company
+                if company is not None:
+                    grouped.setdefault(company_key(company, fid), []).append(entry)
+        for entries in grouped.values():
+            entries.sort()
+        self._groups = {key: FuelTypeStats(entries) for key, entries in grouped.items()}
+        self._company_of = company_of
+        self._refresh_stats(set(self._stats) | set(self._groups))
+
+    def update(self, snapshot: FuelSnapshot | None, diff: PriceDiff) -> None:
+        """Bring the statistics in line with ``snapshot`` given its diff."""
+        if snapshot is None or len(diff.changed) > len(snapshot) * _REBUILD_RATIO:
+            self.rebuild(snapshot)
+            return
+        groups = self._groups
+        company_of = self._company_of
+        stations = snapshot.stations
+        for sid, station in stations.items():
+            if company_of.get(sid, station.company) != station.company:
+                # moved to another company, possibly without a price change;
+                # that is rare enough to regroup everything
+                self.rebuild(snapshot)
+                return
+        touched: set[Any] = set()
+        gone: set[str] = set()
+
+        def _group(key: Any) -> FuelTypeStats:
+            touched.add(key)
+            stats = groups.get(key)
+            if stats is None:
+                stats = groups[key] = FuelTypeStats()
+            return stats
+
+        for (sid, fid), (old, new) in diff.changed.items():
+            if old is not None:
+                _group(fid).remove(old, sid)
+                company = company_of.get(sid)
+                if company is not None:
+                    _group(company_key(company, fid)).remove(old, sid)
+            station = stations.get(sid)
+            if station is None:
+                gone.add(sid)
+                continue
+            company = company_of[sid] = station.company
+            if new is not None:
+                _group(fid).add(new, sid)
+                if company is not None:
+                    _group(company_key(company, fid)).add(new, sid)
+        for sid in gone:
+            company_of.pop(sid, None)
+        self._refresh_stats(touched)
+
+    def _refresh_stats(self, keys: set[Any]) -> None:
+        changed = set()
+        for key in keys:
+            stats = self._groups.get(key)
+            value = stats.as_dict() if stats is not None else None
+            if value != self._stats.get(key):
+                changed.add(key)
+            self._stats[key] = value
+        self.changed = changed
+
+    def get(self, key: Any) -> dict[str, Any] | None:
+        """Return the statistics of a fuel type or ``company_key``, or None when it has no prices."""
+        return self._stats.get(key)
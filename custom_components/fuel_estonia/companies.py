@@ -0,0 +1,34 @@
+"""Company id to name mapping shipped as ``company_map.json``."""
+from __future__ import annotations
+
+from functools import lru_cache
+import json
+import logging
+from pathlib import Path
+
+from homeassistant.core import HomeAssistant
+
+_LOGGER = logging.getLogger(__name__)
+
+COMPANY_MAP_FILE = Path(__file__).with_name("company_map.json")
+
+
+@lru_cache(maxsize=1)
+def load_company_map() -> dict[str, str]:
+    """Read the mapping once per process; later calls return the cached dict."""
+    try:
+        data = json.loads(COMPANY_MAP_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        _LOGGER.exception("Failed reading %s", COMPANY_MAP_FILE)
+        return {}
+    mappings = data.get("mappings") if isinstance(data, dict) else None
+    if not isinstance(mappings, dict):
+        return {}
+    return {str(cid): str(name) for cid, name in mappings.items()}
+
+
+async def async_get_company_map(hass: HomeAssistant) -> dict[str, str]:
+    """Return the company mapping, reading the file off the event loop the first time."""
+    if load_company_map.cache_info().currsize:
+        return load_company_map()
+    return await hass.async_add_executor_job(load_company_map)
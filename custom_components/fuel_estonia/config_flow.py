@@ -3,8 +3,25 @@ from __future__ import annotations
 import voluptuous as vol
 import logging
 from homeassistant import config_entries
+from homeassistant.helpers.selector import (
+    SelectOptionDict,
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
+)
 
-from .const import DOMAIN, DEFAULT_API, UPDATE_INTERVAL
+from .const import (
+    DOMAIN,
+    DEFAULT_API,
+    DEFAULT_HISTORY_SIZE,
+    DEFAULT_MAX_UPDATE_INTERVAL,
+    DEFAULT_MIN_UPDATE_INTERVAL,
+    UPDATE_INTERVAL,
+)
+
+
+def _multi_select(options: list[SelectOptionDict]) -> SelectSelector:
+    return SelectSelector(SelectSelectorConfig(options=options, multiple=True, custom_value=True, mode=SelectSelectorMode.DROPDOWN))
 
 
 class FuelEstoniaFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
@@ -45,12 +62,48 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     async def async_step_init(self, user_input=None):
         errors = {}
         if user_input is not None:
-            return self.async_create_entry(title="", data=user_input)
+            if user_input.get("min_update_interval", 0) > user_input.get("max_update_interval", DEFAULT_MAX_UPDATE_INTERVAL):
+                errors["base"] = "invalid_interval_bounds"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._config_entry.options
+        # choices come from the current snapshot; an empty selection means all
+        entry_data = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id) or {}
+        coordinator = entry_data.get("coordinator")
+        snapshot = coordinator.data if coordinator is not None else None
+        companies: list[SelectOptionDict] = []
+        stations: list[SelectOptionDict] = []
+        fuel_types: list[SelectOptionDict] = []
+        if snapshot:
+            companies = sorted(
+                (SelectOptionDict(value=cid, label=coordinator.company_name(cid)) for cid in snapshot.companies),
+                key=lambda option: option["label"],
+            )
+            stations = [
+                SelectOptionDict(value=station.id, label=station.name)
+                for station in sorted(snapshot.stations.values(), key=lambda station: station.name)
+            ]
+            fuel_types = [SelectOptionDict(value=fid, label=fname) for fid, fname in snapshot.fuel_types.items()]
 
         schema = vol.Schema(
             {
-                vol.Required("api_url", default=self._config_entry.data.get("api_url", DEFAULT_API)): str,
+                vol.Required("api_url", default=options.get("api_url", self._config_entry.data.get("api_url", DEFAULT_API))): str,
+                vol.Optional("country_ids", default=options.get("country_ids", [])): _multi_select(
+                    [SelectOptionDict(value="1", label="Estonia")]
+                ),
                 vol.Required("update_interval", default=self._config_entry.options.get("update_interval", UPDATE_INTERVAL)): int,
+                vol.Optional("adaptive_polling", default=options.get("adaptive_polling", False)): bool,
+                vol.Optional("min_update_interval", default=options.get("min_update_interval", DEFAULT_MIN_UPDATE_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=10)),
+                vol.Optional("max_update_interval", default=options.get("max_update_interval", DEFAULT_MAX_UPDATE_INTERVAL)): vol.All(vol.Coerce(int), vol.Range(min=10)),
+                vol.Optional("long_term_statistics", default=options.get("long_term_statistics", False)): bool,
+                vol.Optional("streaming_parser", default=self._config_entry.options.get("streaming_parser", False)): bool,
+                vol.Optional("geofence_zone", default=self._config_entry.options.get("geofence_zone", "")): str,
+                vol.Optional("geofence_radius", default=self._config_entry.options.get("geofence_radius", 0)): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                vol.Optional("history_size", default=self._config_entry.options.get("history_size", DEFAULT_HISTORY_SIZE)): vol.All(vol.Coerce(int), vol.Range(min=0, max=256)),
+                vol.Optional("companies", default=options.get("companies", [])): _multi_select(companies),
+                vol.Optional("stations", default=options.get("stations", [])): _multi_select(stations),
+                vol.Optional("fuel_types", default=options.get("fuel_types", [])): _multi_select(fuel_types),
             }
         )
 
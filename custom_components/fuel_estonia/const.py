@@ -1,5 +1,17 @@
 DOMAIN = "fuel_estonia"
 DEFAULT_NAME = "Fuel Estonia"
 DEFAULT_API = "https://fuelest.ee/Home/GetLatestPriceDataByStations?countryId=1"
+# country feeds of one entry downloaded at the same time
+MAX_CONCURRENT_FETCHES = 4
 PLATFORMS = ["sensor"]
 UPDATE_INTERVAL = 300
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30
+DEFAULT_HISTORY_SIZE = 16
+# bounds of the adaptive polling interval, in seconds
+DEFAULT_MIN_UPDATE_INTERVAL = 60
+DEFAULT_MAX_UPDATE_INTERVAL = 1800
+# options applied by re-selecting entities instead of reloading the entry
+SELECTION_OPTIONS = ("companies", "stations", "fuel_types", "geofence_zone", "geofence_radius")
+# successful refreshes a fuel type must be missing before its device is detached
+DEVICE_REMOVAL_REFRESHES = 3
@@ -0,0 +1,270 @@
+"""Data update coordinator for the fuel_estonia integration."""
+from __future__ import annotations
+
+import asyncio
+from datetime import timedelta
+import logging
+import time
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DEFAULT_HISTORY_SIZE,
+    DEFAULT_MAX_UPDATE_INTERVAL,
+    DEFAULT_MIN_UPDATE_INTERVAL,
+    DOMAIN,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+from .aggregates import FuelAggregates
+from .fetcher import FuelFeedFetcher, MultiFeedFetcher
+from .history import PriceHistory
+from .metrics import Metrics
+from .scheduler import AdaptiveInterval
+from .snapshot import FuelSnapshot, PriceDiff, diff_snapshots
+from .spatial import StationGrid
+
+_LOGGER = logging.getLogger(__name__)
+
+# forced refreshes requested within this many seconds are merged into one
+FORCE_REFRESH_DELAY = 1.0
+# a poll takes the shared fetcher's snapshot when it was fetched within this
+# share of the entry's interval, so entries on one url download it once
+SHARED_FETCH_WINDOW = 0.9
+
+
+class FuelEstoniaCoordinator(DataUpdateCoordinator[FuelSnapshot | None]):
+    """Coordinator that only wakes the price sensors whose value changed.
+
+    Price sensors register with their (station_id, fuel_type_id) as the
+    listener context and aggregate sensors with their ``FuelAggregates``
+    key. Listeners without a context (entity creation, device sync) are
+    always notified. Price sensors whose price held after a move at the
+    previous refresh are updated too, as their ``change`` attribute is
+    now 0.
+
+    The last snapshot is persisted to HA storage so entities can be set up
+    from it after a restart, before the network refresh completes.
+
+    With the ``adaptive_polling`` option the interval after each refresh
+    comes from an ``AdaptiveInterval`` fed with whether the refresh saw a
+    price change; its learned profile is persisted alongside.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, fetcher: FuelFeedFetcher | MultiFeedFetcher, update_interval: int) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{entry.entry_id}",
+            update_interval=timedelta(seconds=update_interval),
+            # an unchanged feed returns the same snapshot; don't notify listeners
+            always_update=False,
+        )
+        self.entry = entry
+        self.fetcher = fetcher
+        self.last_diff: PriceDiff | None = None
+        # spatial index over the current snapshot's stations
+        self.grid = StationGrid()
+        self.aggregates = FuelAggregates()
+        self.history = PriceHistory(entry.options.get("history_size", DEFAULT_HISTORY_SIZE))
+        # company id -> display name from company_map.json, set at entry setup
+        self.company_names: dict[str, str] = {}
+        self._store: Store[dict] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+        self.scheduler: AdaptiveInterval | None = None
+        if entry.options.get("adaptive_polling", False):
+            self.scheduler = AdaptiveInterval(
+                update_interval,
+                entry.options.get("min_update_interval", DEFAULT_MIN_UPDATE_INTERVAL),
+                entry.options.get("max_update_interval", DEFAULT_MAX_UPDATE_INTERVAL),
+            )
+        self._polling_store: Store[dict] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}.polling")
+        self._last_poll: float | None = None
+        # called after every adaptive interval update, changed data or not
+        self._interval_listeners: list[CALLBACK_TYPE] = []
+        # entity listeners woken by the last refresh
+        self.last_notified = 0
+        # diff / fan-out timings; fetch timings live on the (shared) fetcher
+        self.metrics = Metrics()
+        self._forced_refresh: asyncio.Task[dict[str, Any]] | None = None
+        # set while a forced refresh runs: it always downloads
+        self._forcing = False
+        self.statistics = None
+        if entry.options.get("long_term_statistics", False):
+            if "recorder" in hass.config.components:
+                # imported lazily so the recorder is only touched when asked for
+                from .longterm import LongTermPriceStatistics
+
+                self.statistics = LongTermPriceStatistics(hass, entry)
+            else:
+                _LOGGER.warning("long_term_statistics is on for %s but the recorder is not loaded", entry.entry_id)
+
+    async def async_restore(self) -> bool:
+        """Load the persisted snapshot as current data, if there is one."""
+        if self.scheduler is not None:
+            try:
+                self.scheduler.restore(await self._polling_store.async_load())
+            except Exception:
+                _LOGGER.exception("Failed loading polling profile for %s", self.entry.entry_id)
+            self.update_interval = timedelta(seconds=self.scheduler.interval(dt_util.now().hour))
+        try:
+            stored = await self._store.async_load()
+        except Exception:
+            _LOGGER.exception("Failed loading stored snapshot for %s", self.entry.entry_id)
+            return False
+        if not stored:
+            return False
+        try:
+            snapshot = FuelSnapshot.from_storage(stored)
+        except (TypeError, ValueError):
+            # unreadable file: start empty, the next refresh overwrites it
+            _LOGGER.warning("Discarding unreadable stored snapshot for %s", self.entry.entry_id)
+            return False
+        self.data = snapshot
+        self.grid = StationGrid.build(self.data.stations.values())
+        self.aggregates.rebuild(self.data)
+        self.history.record(time.time(), diff_snapshots(None, self.data), self.data)
+        _LOGGER.debug("Restored %s prices for %s from storage", len(self.data), self.entry.entry_id)
+        return True
+
+    async def async_force_refresh(self) -> dict[str, Any]:
+        """Refresh now and report how it went.
+
+        Calls arriving while a forced refresh is pending or running share
+        it and get the same report.
+        """
+        task = self._forced_refresh
+        if task is None or task.done():
+            task = self._forced_refresh = self.hass.async_create_task(self._async_forced_refresh())
+        return await asyncio.shield(task)
+
+    async def _async_forced_refresh(self) -> dict[str, Any]:
+        await asyncio.sleep(FORCE_REFRESH_DELAY)
+        start = time.monotonic()
+        self._forcing = True
+        try:
+            await self.async_refresh()
+        finally:
+            self._forcing = False
+        return {
+            "success": self.last_update_success and not self.fetcher.last_fetch_failed,
+            "latency_ms": round((time.monotonic() - start) * 1000, 1),
+            "payload_bytes": self.fetcher.last_payload_bytes,
+            "changed_entities": self.last_notified,
+        }
+
+    async def _async_update_data(self) -> FuelSnapshot | None:
+        _LOGGER.debug("async_fetch_data starting for entry %s", self.entry.entry_id)
+        self.last_notified = 0
+        max_age = 0 if self._forcing or self.update_interval is None else self.update_interval.total_seconds() * SHARED_FETCH_WINDOW
+        snapshot = await self.fetcher.async_fetch(max_age)
+        if snapshot is None and self.data is not None:
+            # nothing fetched yet since the restore: keep serving the restored
+            # prices instead of diffing them away as disappeared
+            snapshot = self.data
+        if snapshot is None and self.fetcher.last_fetch_failed:
+            raise UpdateFailed(f"Fetching fuel data failed for {self.entry.entry_id}")
+        if snapshot is self.data:
+            self.last_diff = PriceDiff(unchanged=len(snapshot) if snapshot is not None else 0)
+            self.aggregates.changed = set()
+            self.metrics.inc("unchanged_refreshes")
+            if not self.fetcher.last_fetch_failed:
+                self.history.record(time.time(), self.last_diff, snapshot)
+                # listeners are not notified of unchanged data; their change is 0 now
+                self._async_update_settled()
+        else:
+            start = time.perf_counter()
+            self.last_diff = diff_snapshots(self.data, snapshot)
+            self.aggregates.update(snapshot, self.last_diff)
+            self.history.record(time.time(), self.last_diff, snapshot)
+            if snapshot is not None:
+                self.grid = StationGrid.build(snapshot.stations.values())
+                self._store.async_delay_save(snapshot.as_storage, STORAGE_SAVE_DELAY)
+            self.metrics.observe("derive_seconds", time.perf_counter() - start)
+            self.metrics.inc("changed_prices", self.last_diff.changed_count)
+        if self.statistics is not None:
+            self.metrics.inc("statistics_rows", self.statistics.async_record(snapshot, self.last_diff))
+        _LOGGER.debug(
+            "Refresh for %s: %s prices changed, %s unchanged",
+            self.entry.entry_id,
+            self.last_diff.changed_count,
+            self.last_diff.unchanged,
+        )
+        if self.scheduler is not None:
+            self._adapt_interval(self.last_diff.changed_count > 0)
+        return snapshot
+
+    def _adapt_interval(self, changed: bool) -> None:
+        """Feed the refresh outcome to the scheduler and apply its next interval."""
+        now = time.monotonic()
+        hour = dt_util.now().hour
+        if self._last_poll is not None:
+            self.scheduler.record(hour, now - self._last_poll, changed)
+            self._polling_store.async_delay_save(self.scheduler.as_storage, STORAGE_SAVE_DELAY)
+        self._last_poll = now
+        self.update_interval = timedelta(seconds=self.scheduler.interval(hour))
+        for update_callback in list(self._interval_listeners):
+            update_callback()
+
+    @callback
+    def async_add_interval_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Call ``update_callback`` whenever the adaptive interval is recomputed.
+
+        With ``always_update=False`` unchanged refreshes notify no one, yet
+        those are exactly the ones that stretch the interval.
+        """
+        self._interval_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._interval_listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_update_settled(self) -> None:
+        """Update the price sensors whose price held after a move."""
+        settled = self.history.settled
+        if not settled:
+            return
+        notified = 0
+        for update_callback, context in list(self._listeners.values()):
+            if context in settled:
+                notified += 1
+                update_callback()
+        self.last_notified = notified
+        self.metrics.inc("entity_updates", notified)
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Notify listeners, skipping price sensors whose price is unchanged."""
+        diff = self.last_diff
+        if diff is None or not self.last_update_success:
+            super().async_update_listeners()
+            return
+        start = time.perf_counter()
+        changed = diff.changed
+        settled = self.history.settled
+        changed_aggregates = self.aggregates.changed
+        notified = 0
+        for update_callback, context in list(self._listeners.values()):
+            if context is None:
+                update_callback()
+                continue
+            if isinstance(context, tuple) and len(context) == 2:
+                if context not in changed and context not in settled:
+                    continue
+            elif context not in changed_aggregates:
+                continue
+            notified += 1
+            update_callback()
+        self.last_notified = notified
+        self.metrics.observe("fanout_seconds", time.perf_counter() - start)
+        self.metrics.inc("entity_updates", notified)
+
+    def company_name(self, company_id: str) -> str:
+        return self.company_names.get(company_id, company_id)
@@ -0,0 +1,92 @@
+"""Keep the per-fuel-type devices in the device registry in sync."""
+from __future__ import annotations
+
+import logging
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+
+from .const import DEVICE_REMOVAL_REFRESHES, DOMAIN
+from .snapshot import FuelSnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+_IDENTIFIER_PREFIX = "fuel_type_"
+
+
+class FuelTypeDeviceSync:
+    """Device registry sync for one config entry.
+
+    Remembers the fuel types (and their names) that already have a device,
+    seeded from the registry on first use. A sync only touches the
+    registry for fuel types that are new or renamed.
+
+    Detaching the entry from a device deletes every entity on it, so a
+    fuel type has to be missing from ``DEVICE_REMOVAL_REFRESHES``
+    consecutive complete snapshots first. A failed or partial refresh
+    never counts towards that.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self.entry = entry
+        self._known: dict[str, str] | None = None
+        self._snapshot: FuelSnapshot | None = None
+        # fuel type id -> complete snapshots it has been missing from
+        self._missing: dict[str, int] = {}
+
+    def _load_known(self, registry: dr.DeviceRegistry) -> dict[str, str]:
+        known: dict[str, str] = {}
+        for device in dr.async_entries_for_config_entry(registry, self.entry.entry_id):
+            for domain, identifier in device.identifiers:
+                if domain == DOMAIN and identifier.startswith(_IDENTIFIER_PREFIX):
+                    known[identifier[len(_IDENTIFIER_PREFIX):]] = device.name or ""
+        return known
+
+    @callback
+    def async_sync(self, snapshot: FuelSnapshot | None, complete: bool = True) -> set[str]:
+        """Bring the devices in line with ``snapshot``; return the fuel types detached."""
+        if not snapshot:
+            return set()
+        fuel_types = snapshot.fuel_types
+        # the same snapshot again is not a new observation
+        fresh, self._snapshot = snapshot is not self._snapshot, snapshot
+        if fuel_types == self._known:
+            self._missing.clear()
+            return set()
+
+        registry = dr.async_get(self.hass)
+        known = self._known if self._known is not None else self._load_known(registry)
+
+        for fid, fname in fuel_types.items():
+            if known.get(fid) == fname:
+                continue
+            _LOGGER.debug("Syncing device fuel_type_%s name=%s", fid, fname)
+            registry.async_get_or_create(
+                config_entry_id=self.entry.entry_id,
+                identifiers={(DOMAIN, f"{_IDENTIFIER_PREFIX}{fid}")},
+                name=str(fname),
+                manufacturer="FuelEstonia",
+            )
+
+        missing = self._missing
+        for fid in list(missing):
+            if fid in fuel_types:
+                del missing[fid]
+        removed: set[str] = set()
+        known = {**known, **fuel_types}
+        for fid in known.keys() - fuel_types.keys():
+            if fresh and complete:
+                missing[fid] = missing.get(fid, 0) + 1
+            if missing.get(fid, 0) < DEVICE_REMOVAL_REFRESHES:
+                continue
+            del missing[fid], known[fid]
+            removed.add(fid)
+            device = registry.async_get_device(identifiers={(DOMAIN, f"{_IDENTIFIER_PREFIX}{fid}")})
+            if device is not None:
+                _LOGGER.debug("Removing device fuel_type_%s from entry %s", fid, self.entry.entry_id)
+                registry.async_update_device(device.id, remove_config_entry_id=self.entry.entry_id)
+
+        self._known = known
+        return removed
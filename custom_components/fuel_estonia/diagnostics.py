@@ -0,0 +1,35 @@
+"""Diagnostics support for the fuel_estonia integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    snapshot = coordinator.data
+    diff = coordinator.last_diff
+    scheduler = coordinator.scheduler
+    return {
+        "stations": len(snapshot.stations) if snapshot else 0,
+        "fuel_types": len(snapshot.fuel_types) if snapshot else 0,
+        "prices": len(snapshot) if snapshot else 0,
+        "last_refresh": {
+            "changed": diff.changed_count if diff else None,
+            "unchanged": diff.unchanged if diff else None,
+        },
+        "metrics": {
+            "fetch": {fetcher.api_url: fetcher.metrics.as_dict() for fetcher in coordinator.fetcher.fetchers},
+            "refresh": coordinator.metrics.as_dict(),
+        },
+        "polling": {
+            "update_interval": coordinator.update_interval.total_seconds() if coordinator.update_interval else None,
+            "adaptive": scheduler is not None,
+            "changes_per_hour": scheduler.profile() if scheduler is not None else None,
+        },
+    }
@@ -0,0 +1,280 @@
+"""HTTP access to the fuelest.ee price feed."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from aiohttp import ClientError, hdrs
+import async_timeout
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util.json import json_loads
+
+from .const import DOMAIN
+from .metrics import BYTES_BUCKETS, Metrics
+from .snapshot import FuelSnapshot, SnapshotParser, build_snapshot_streaming
+
+_LOGGER = logging.getLogger(__name__)
+
+# hass.data key of the fetchers shared between entries, by (api_url, streaming)
+SHARED_FETCHERS = f"{DOMAIN}_fetchers"
+
+
+class FuelFeedFetcher:
+    """Fetch the feed conditionally and turn it into a snapshot.
+
+    The fetcher remembers the validators and a hash of the last body, so a
+    poll that returns 304 or the same bytes hands back the previous
+    snapshot object without decoding anything. Coordinators created with
+    ``always_update=False`` then skip notifying their listeners.
+
+    With ``streaming`` enabled the body is parsed incrementally, in the
+    executor, and only the station/fuel/price values end up in memory.
+
+    When every attempt fails, or the body cannot be parsed, the previous
+    snapshot is returned and ``last_fetch_failed`` is set, so a failed
+    poll never looks like every price disappeared.
+
+    Calls to ``async_fetch`` while a fetch is running wait for that fetch
+    instead of starting another, so entries sharing a fetcher (see
+    ``async_acquire_fetcher``) all get the same snapshot object. Entries
+    poll on their own timers, so a call may also pass ``max_age`` to take
+    the snapshot of a successful fetch started less than that many seconds
+    ago instead of downloading again.
+    """
+
+    def __init__(self, hass: HomeAssistant, api_url: str, streaming: bool = False) -> None:
+        self.hass = hass
+        self.api_url = api_url
+        self.streaming = streaming
+        self.snapshot: FuelSnapshot | None = None
+        self._parser = SnapshotParser()
+        self._etag: str | None = None
+        self._last_modified: str | None = None
+        self._body_hash: bytes | None = None
+        self._inflight: asyncio.Task[FuelSnapshot | None] | None = None
+        # monotonic start time of the last successful fetch
+        self._fetched_at: float | None = None
+        # size of the last response body, 0 after a 304
+        self.last_payload_bytes: int | None = None
+        self.last_fetch_failed = False
+        # number of config entries using this fetcher
+        self.refs = 0
+        self.metrics = Metrics()
+
+    @property
+    def fetchers(self) -> tuple[FuelFeedFetcher, ...]:
+        return (self,)
+
+    def _request_headers(self) -> dict[str, str]:
+        headers = {hdrs.ACCEPT_ENCODING: "gzip, deflate"}
+        if self.snapshot is not None:
+            if self._etag:
+                headers[hdrs.IF_NONE_MATCH] = self._etag
+            if self._last_modified:
+                headers[hdrs.IF_MODIFIED_SINCE] = self._last_modified
+        return headers
+
+    async def async_fetch(self, max_age: float = 0) -> FuelSnapshot | None:
+        """Return the current snapshot; the previous one when the fetch failed."""
+        if (
+            max_age > 0
+            and self._fetched_at is not None
+            and self._inflight is None
+            and time.monotonic() - self._fetched_at < max_age
+        ):
+            self.metrics.inc("shared_fetches")
+            return self.snapshot
+        task = self._inflight
+        if task is None:
+            task = self._inflight = self.hass.async_create_task(self._async_fetch())
+            task.add_done_callback(self._fetch_done)
+        # one caller being cancelled must not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    def _fetch_done(self, task: asyncio.Task) -> None:
+        if self._inflight is task:
+            self._inflight = None
+
+    async def _async_fetch(self) -> FuelSnapshot | None:
+        self.metrics.inc("fetches")
+        self.last_fetch_failed = False
+        started = time.monotonic()
+        snapshot = await self._async_download()
+        if not self.last_fetch_failed:
+            self._fetched_at = started
+        return snapshot
+
+    async def _async_download(self) -> FuelSnapshot | None:
+        session = async_get_clientsession(self.hass)
+        attempts = 3
+        backoff = 1
+        metrics = self.metrics
+        for attempt in range(1, attempts + 1):
+            _LOGGER.debug("fetch attempt %s for %s", attempt, self.api_url)
+            start = time.perf_counter()
+            try:
+                async with async_timeout.timeout(10):
+                    resp = await session.get(self.api_url, headers=self._request_headers())
+                    if resp.status == 304:
+                        _LOGGER.debug("%s not modified", self.api_url)
+                        resp.release()
+                        metrics.observe("fetch_seconds", time.perf_counter() - start)
+                        metrics.inc("not_modified")
+                        self.last_payload_bytes = 0
+                        return self.snapshot
+                    resp.raise_for_status()
+                    body = await resp.read()
+                    etag = resp.headers.get(hdrs.ETAG)
+                    last_modified = resp.headers.get(hdrs.LAST_MODIFIED)
+            except ClientError as err:
+                _LOGGER.debug("Attempt %s: HTTP error fetching fuel data: %s", attempt, err)
+            except asyncio.TimeoutError:
+                _LOGGER.debug("Attempt %s: Timeout fetching fuel data", attempt)
+            except Exception:
+                _LOGGER.exception("Attempt %s: Unexpected error fetching fuel data", attempt)
+            else:
+                metrics.observe("fetch_seconds", time.perf_counter() - start)
+                metrics.observe("payload_bytes", len(body), BYTES_BUCKETS)
+                return await self._async_process(body, etag, last_modified)
+
+            if attempt < attempts:
+                metrics.inc("retries")
+                await asyncio.sleep(backoff)
+                backoff *= 2
+
+        metrics.inc("failures")
+        _LOGGER.error("All attempts to fetch fuel data failed for %s", self.api_url)
+        self.last_fetch_failed = True
+        return self.snapshot
+
+    def _failed(self, message: str) -> FuelSnapshot | None:
+        self.metrics.inc("invalid_payloads")
+        _LOGGER.exception(message, self.api_url)
+        self.last_fetch_failed = True
+        return self.snapshot
+
+    async def _async_process(self, body: bytes, etag: str | None, last_modified: str | None) -> FuelSnapshot | None:
+        self.last_payload_bytes = len(body)
+        body_hash = hashlib.blake2b(body, digest_size=16).digest()
+        if self.snapshot is not None and body_hash == self._body_hash:
+            _LOGGER.debug("%s body unchanged, reusing snapshot", self.api_url)
+            self.metrics.inc("unchanged_body")
+            self._etag, self._last_modified = etag, last_modified
+            return self.snapshot
+
+        metrics = self.metrics
+        start = time.perf_counter()
+        if self.streaming:
+            # decoding and extraction happen in the same pass; it is several
+            # times slower than json_loads, so keep it off the event loop
+            try:
+                snapshot = await self.hass.async_add_executor_job(build_snapshot_streaming, body)
+            except Exception:
+                return self._failed("Invalid JSON from %s")
+        else:
+            try:
+                data = json_loads(body)
+            except ValueError:
+                return self._failed("Invalid JSON from %s")
+            decoded = time.perf_counter()
+            metrics.observe("decode_seconds", decoded - start)
+            start = decoded
+            # normalize once per refresh so sensors can do O(1) lookups
+            snapshot = self._parser.parse(data)
+        metrics.observe("extract_seconds", time.perf_counter() - start)
+        if snapshot is None:
+            metrics.inc("invalid_payloads")
+            _LOGGER.error("Unrecognized payload from %s", self.api_url)
+            self.last_fetch_failed = True
+            return self.snapshot
+        _LOGGER.debug("fetch success for %s, received %s prices", self.api_url, len(snapshot))
+        self.snapshot = snapshot
+        self._body_hash = body_hash
+        self._etag, self._last_modified = etag, last_modified
+        return snapshot
+
+
+class MultiFeedFetcher:
+    """Fetch several feeds concurrently and merge them into one snapshot.
+
+    At most ``limit`` feeds download at once. A feed that fails keeps
+    contributing its last good snapshot, so one country being down does
+    not hold back the others. When every part comes back as the same
+    object as last time, so does the merged snapshot.
+    """
+
+    def __init__(self, fetchers: list[FuelFeedFetcher], limit: int) -> None:
+        self.fetchers = tuple(fetchers)
+        self._semaphore = asyncio.Semaphore(max(1, limit))
+        self._parts: tuple[FuelSnapshot | None, ...] = ()
+        self.snapshot: FuelSnapshot | None = None
+
+    @property
+    def last_payload_bytes(self) -> int | None:
+        sizes = [fetcher.last_payload_bytes for fetcher in self.fetchers if fetcher.last_payload_bytes is not None]
+        return sum(sizes) if sizes else None
+
+    @property
+    def last_fetch_failed(self) -> bool:
+        return any(fetcher.last_fetch_failed for fetcher in self.fetchers)
+
+    async def _async_fetch_one(self, fetcher: FuelFeedFetcher, max_age: float) -> FuelSnapshot | None:
+        async with self._semaphore:
+            return await fetcher.async_fetch(max_age)
+
+    async def async_fetch(self, max_age: float = 0) -> FuelSnapshot | None:
+        results = await asyncio.gather(
+            *(self._async_fetch_one(fetcher, max_age) for fetcher in self.fetchers), return_exceptions=True
+        )
+        parts = []
+        for fetcher, result in zip(self.fetchers, results):
+            if isinstance(result, BaseException) or result is None:
+                if isinstance(result, BaseException):
+                    _LOGGER.error("Fetching %s failed: %s", fetcher.api_url, result)
+                result = fetcher.snapshot
+            parts.append(result)
+        parts_t = tuple(parts)
+        if len(parts_t) == len(self._parts) and all(a is b for a, b in zip(parts_t, self._parts)):
+            return self.snapshot
+        self._parts = parts_t
+        available = [part for part in parts_t if part is not None]
+        self.snapshot = FuelSnapshot.merge(available) if available else None
+        return self.snapshot
+
+
+def country_url(api_url: str, country_id: str) -> str:
+    """Return ``api_url`` with its ``countryId`` query parameter set to ``country_id``."""
+    parts = urlsplit(api_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != "countryId"]
+    query.append(("countryId", str(country_id)))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+@callback
+def async_acquire_fetcher(hass: HomeAssistant, api_url: str, streaming: bool = False) -> FuelFeedFetcher:
+    """Return the fetcher shared by every entry polling ``api_url`` with the same parser.
+
+    Pair every call with ``async_release_fetcher``.
+    """
+    fetchers: dict[tuple[str, bool], FuelFeedFetcher] = hass.data.setdefault(SHARED_FETCHERS, {})
+    fetcher = fetchers.get((api_url, streaming))
+    if fetcher is None:
+        fetcher = fetchers[(api_url, streaming)] = FuelFeedFetcher(hass, api_url, streaming=streaming)
+    fetcher.refs += 1
+    return fetcher
+
+
+@callback
+def async_release_fetcher(hass: HomeAssistant, fetcher: FuelFeedFetcher) -> None:
+    """Drop one reference; the last one removes the fetcher."""
+    fetcher.refs -= 1
+    if fetcher.refs <= 0:
+        fetchers = hass.data.get(SHARED_FETCHERS, {})
+        key = (fetcher.api_url, fetcher.streaming)
+        if fetchers.get(key) is fetcher:
+            del fetchers[key]
@@ -0,0 +1,194 @@
+"""Bounded in-memory price history per station and fuel type."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .snapshot import FuelSnapshot, PriceDiff
+
+HOUR = 3600.0
+DAY = 86400.0
+WEEK = 7 * DAY
+# hours without a refresh that are still filled in with the last price
+MAX_GAP_HOURS = 24
+
+
+class _Series:
+    """Parallel timestamp/price arrays of one (station, fuel) pair."""
+
+    __slots__ = ("times", "prices")
+
+    def __init__(self) -> None:
+        self.times = array("d")
+        self.prices = array("d")
+
+
+class PriceHistory:
+    """Ring buffer of price changes per (station_id, fuel_type_id).
+
+    A point is recorded only when a price changes, so a buffer of
+    ``capacity`` points covers ``capacity`` price moves. When a buffer is
+    full the oldest point is dropped. Points older than a week are dropped
+    too, except the newest of them, which gives the price in effect at the
+    start of the window. Memory is therefore bounded by
+    ``capacity * 16 bytes`` per pair. A capacity of 0 disables recording.
+
+    ``record`` is called after every successful refresh, changed or not.
+    ``settled`` then holds the pairs that moved at the refresh before but
+    not at this one: their ``change`` went back to 0.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = max(0, int(capacity))
+        self._series: dict[tuple[str, str], _Series] = {}
+        self.last_refresh: float | None = None
+        # pairs with a price move at the last refresh
+        self._moved: set[tuple[str, str]] = set()
+        self.settled: set[tuple[str, str]] = set()
+
+    def record(self, now: float, diff: PriceDiff, snapshot: FuelSnapshot | None) -> None:
+        """Append the new prices of a refresh diff.
+
+        A series is dropped only when its pair is no longer in ``snapshot``,
+        the result of a successful refresh; a pair that merely lost its
+        price keeps its history.
+        """
+        if not self.capacity:
+            return
+        self.last_refresh = now
+        series_map = self._series
+        moved: set[tuple[str, str]] = set()
+        for key, (_old, new) in diff.changed.items():
+            if new is None:
+                if snapshot is not None and key not in snapshot:
+                    series_map.pop(key, None)
+                continue
+            series = series_map.get(key)
+            if series is None:
+                series = series_map[key] = _Series()
+            self._append(series, now, new)
+            if len(series.times) > 1:
+                moved.add(key)
+        self.settled = self._moved - moved
+        self._moved = moved
+
+    def _append(self, series: _Series, now: float, price: float) -> None:
+        times, prices = series.times, series.prices
+        if len(times) >= self.capacity:
+            del times[0]
+            del prices[0]
+        # keep a single point from before the weekly window as its baseline
+        while len(times) > 1 and times[1] <= now - WEEK:
+            del times[0]
+            del prices[0]
+        times.append(now)
+        prices.append(price)
+
+    def stats(self, key: tuple[str, str], now: float) -> dict[str, Any] | None:
+        """Return trend attributes for a pair, or None without history.
+
+        ``previous_price`` is the price before the last move and ``change``
+        the move at the latest refresh (0 when the price held). Both are
+        None while only one price is known. ``change_24h`` is None until
+        the history reaches back 24 hours; the 7 day range covers what
+        there is.
+        """
+        series = self._series.get(key)
+        if series is None or not series.times:
+            return None
+        times, prices = series.times, series.prices
+        current = prices[-1]
+        previous = prices[-2] if len(prices) > 1 else None
+        if previous is None:
+            change = None
+        elif times[-1] == self.last_refresh:
+            change = round(current - previous, 3)
+        else:
+            change = 0.0
+        day_idx = bisect_right(times, now - DAY) - 1
+        week_idx = max(bisect_right(times, now - WEEK) - 1, 0)
+        window = prices[week_idx:]
+        return {
+            "previous_price": previous,
+            "change": change,
+            "change_24h": round(current - prices[day_idx], 3) if day_idx >= 0 else None,
+            "min_7d": min(window),
+            "max_7d": max(window),
+        }
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+
+class HourlyPrices:
+    """Time-weighted hourly mean/min/max per (station_id, fuel_type_id).
+
+    ``observe`` is called after every refresh with the snapshot and its
+    diff. Only changed prices touch their row; when a refresh lands in a
+    new hour, every row is closed and returned as
+    ``{hour_start: {key: (mean, min, max)}}``, the shape recorder
+    statistics want. Rows are small lists:
+    ``[min, max, weighted_sum, last_price, last_time, first_time]``.
+    """
+
+    def __init__(self) -> None:
+        self.hour: float | None = None
+        self._rows: dict[tuple[str, str], list[float]] = {}
+
+    def observe(self, now: float, snapshot: FuelSnapshot | None, diff: PriceDiff) -> dict[float, dict[tuple[str, str], tuple[float, float, float]]]:
+        closed: dict[float, dict[tuple[str, str], tuple[float, float, float]]] = {}
+        hour = now - now % HOUR
+        if self.hour is None:
+            self.hour = hour
+            if snapshot is not None:
+                self._rows = {key: [price, price, 0.0, price, now, now] for key, price in snapshot.items() if price is not None}
+            return closed
+
+        if hour > self.hour:
+            self._close(closed)
+            # hours nobody refreshed in kept the last prices
+            gap = min(int((hour - self.hour) // HOUR), MAX_GAP_HOURS)
+            for step in range(1, gap):
+                closed[self.hour + step * HOUR] = {key: (row[3], row[3], row[3]) for key, row in self._rows.items()}
+            self.hour = hour
+            for row in self._rows.values():
+                price = row[3]
+                row[:] = [price, price, 0.0, price, hour, hour]
+
+        rows = self._rows
+        for key, (_old, new) in diff.changed.items():
+            row = rows.get(key)
+            if row is None:
+                if new is not None:
+                    rows[key] = [new, new, 0.0, new, now, now]
+                continue
+            if row[3] == row[3]:
+                row[2] += row[3] * (now - row[4])
+            row[4] = now
+            if new is None:
+                # gone from the feed: NaN ends the row at ``now``
+                row[3] = float("nan")
+                continue
+            row[3] = new
+            if new < row[0]:
+                row[0] = new
+            if new > row[1]:
+                row[1] = new
+        return closed
+
+    def _close(self, closed: dict[float, dict[tuple[str, str], tuple[float, float, float]]]) -> None:
+        end = self.hour + HOUR
+        hour_rows = closed[self.hour] = {}
+        for key, row in list(self._rows.items()):
+            price = row[3]
+            if price == price:
+                weighted = row[2] + price * (end - row[4])
+                covered = end - row[5]
+            else:
+                weighted = row[2]
+                covered = row[4] - row[5]
+                del self._rows[key]
+            mean = weighted / covered if covered > 0 else row[0]
+            hour_rows[key] = (mean, row[0], row[1])
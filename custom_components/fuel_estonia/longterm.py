@@ -0,0 +1,79 @@
+"""Write hourly price series to recorder long-term statistics."""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Callable
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .history import HourlyPrices
+from .snapshot import FuelSnapshot, PriceDiff
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LongTermPriceStatistics:
+    """Import one external statistic per selected station and fuel type.
+
+    Prices are folded into ``HourlyPrices`` after every refresh; when an
+    hour closes, all finished rows of a series go to the recorder in one
+    ``async_add_external_statistics`` call, so each selected pair costs
+    one recorder job per hour. ``selects`` is set by the entity manager
+    and follows the entry's companies, stations, fuel types and geofence;
+    no entity has to be enabled for a series to be recorded.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry) -> None:
+        self.hass = hass
+        self.entry = entry
+        # nothing is imported until the entity manager applied the selection
+        self.selects: Callable[[tuple[str, str]], bool] = lambda key: False
+        self._hourly = HourlyPrices()
+        self._metadata: dict[tuple[str, str], StatisticMetaData] = {}
+
+    def statistic_id(self, key: tuple[str, str]) -> str:
+        station_id, fuel_type_id = key
+        return f"{DOMAIN}:{slugify(f'{self.entry.entry_id}_{fuel_type_id}_{station_id}')}"
+
+    def _meta(self, key: tuple[str, str], snapshot: FuelSnapshot | None) -> StatisticMetaData:
+        meta = self._metadata.get(key)
+        if meta is None:
+            station = snapshot.stations.get(key[0]) if snapshot else None
+            fuel_name = snapshot.fuel_name(key) if snapshot and key in snapshot else key[1]
+            meta = self._metadata[key] = StatisticMetaData(
+                has_mean=True,
+                has_sum=False,
+                name=f"{station.name if station else key[0]} - {fuel_name}",
+                source=DOMAIN,
+                statistic_id=self.statistic_id(key),
+                unit_of_measurement="EUR",
+            )
+        return meta
+
+    @callback
+    def async_record(self, snapshot: FuelSnapshot | None, diff: PriceDiff, now: float | None = None) -> int:
+        """Fold a refresh in and import the hours it closed; return the rows imported."""
+        closed = self._hourly.observe(time.time() if now is None else now, snapshot, diff)
+        if not closed:
+            return 0
+        selects = self.selects
+        series: dict[tuple[str, str], list[StatisticData]] = {}
+        for hour_start, rows in sorted(closed.items()):
+            start = dt_util.utc_from_timestamp(hour_start)
+            for key, (mean, low, high) in rows.items():
+                if not selects(key):
+                    continue
+                series.setdefault(key, []).append(StatisticData(start=start, mean=mean, min=low, max=high))
+        imported = 0
+        for key, stats in series.items():
+            async_add_external_statistics(self.hass, self._meta(key, snapshot), stats)
+            imported += len(stats)
+        _LOGGER.debug("Imported %s hourly price rows for %s series of %s", imported, len(series), self.entry.entry_id)
+        return imported
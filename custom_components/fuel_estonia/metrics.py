@@ -0,0 +1,77 @@
+"""Cheap in-memory counters and timing histograms for the refresh pipeline."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left
+from typing import Any
+
+# upper bounds of the histogram buckets; the last bucket is unbounded
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1 << 10, 1 << 12, 1 << 14, 1 << 16, 1 << 18, 1 << 20, 1 << 22, 1 << 24)
+
+
+class Histogram:
+    """Fixed-bucket histogram with count, sum and max.
+
+    Recording a value is one bisect and an array increment. Percentiles
+    are reported as the upper bound of the bucket they fall in.
+    """
+
+    __slots__ = ("bounds", "buckets", "count", "total", "max")
+
+    def __init__(self, bounds: tuple[float, ...] = SECONDS_BUCKETS) -> None:
+        self.bounds = bounds
+        self.buckets = array("Q", bytes(8 * (len(bounds) + 1)))
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, share: float) -> float | None:
+        if not self.count:
+            return None
+        rank = share * self.count
+        seen = 0
+        for i, hits in enumerate(self.buckets):
+            seen += hits
+            if seen >= rank:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max if self.count else None,
+        }
+
+
+class Metrics:
+    """Named counters and histograms, created on first use."""
+
+    def __init__(self) -> None:
+        self.counters: dict[str, int] = {}
+        self.histograms: dict[str, Histogram] = {}
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float, bounds: tuple[float, ...] = SECONDS_BUCKETS) -> None:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(bounds)
+        histogram.observe(value)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.as_dict() for name, histogram in self.histograms.items()},
+        }
@@ -0,0 +1,82 @@
+"""Polling interval that follows how often the feed changes at each hour of day."""
+from __future__ import annotations
+
+from array import array
+from typing import Any
+
+HOURS = 24
+# polls wanted per expected price change; every poll seeing a change
+# therefore shrinks the interval until it hits the lower bound
+POLLS_PER_CHANGE = 4
+# observed seconds per hour slot before its rate is trusted
+MIN_OBSERVED = 1800.0
+# observation window per hour slot (about a week of that hour)
+MAX_OBSERVED = 7 * 3600.0
+
+
+class AdaptiveInterval:
+    """Per-hour-of-day change rate learned from refresh outcomes.
+
+    ``record`` adds the seconds since the previous poll and whether the
+    poll saw a price change to the slot of the current local hour. When a
+    slot holds more than ``MAX_OBSERVED`` seconds both counters are scaled
+    down, so old days fade out. ``interval`` uses the busier of the
+    current and next slot, which speeds polling up ahead of hours that
+    usually bring changes, and falls back to ``base`` until enough has
+    been observed.
+    """
+
+    def __init__(self, base: float, minimum: float, maximum: float) -> None:
+        self.minimum = float(min(minimum, maximum))
+        self.maximum = float(max(minimum, maximum))
+        self.base = min(max(float(base), self.minimum), self.maximum)
+        self._seconds = array("d", bytes(8 * HOURS))
+        self._changes = array("d", bytes(8 * HOURS))
+        self.current = self.base
+
+    def record(self, hour: int, seconds: float, changed: bool) -> None:
+        if seconds <= 0:
+            return
+        hour %= HOURS
+        observed = self._seconds[hour] + seconds
+        changes = self._changes[hour] + (1.0 if changed else 0.0)
+        if observed > MAX_OBSERVED:
+            scale = MAX_OBSERVED / observed
+            observed *= scale
+            changes *= scale
+        self._seconds[hour] = observed
+        self._changes[hour] = changes
+
+    def rate(self, hour: int) -> float | None:
+        """Return changes per second seen at ``hour``, or None without enough data."""
+        hour %= HOURS
+        if self._seconds[hour] < MIN_OBSERVED:
+            return None
+        return self._changes[hour] / self._seconds[hour]
+
+    def interval(self, hour: int) -> float:
+        """Return the polling interval in seconds to use at ``hour`` and remember it."""
+        rates = [rate for rate in (self.rate(hour), self.rate(hour + 1)) if rate is not None]
+        if not rates:
+            value = self.base
+        elif max(rates) <= 0:
+            value = self.maximum
+        else:
+            value = min(max(1.0 / (max(rates) * POLLS_PER_CHANGE), self.minimum), self.maximum)
+        self.current = value
+        return value
+
+    def profile(self) -> list[float | None]:
+        """Return the learned changes per hour for each hour of day."""
+        return [None if (rate := self.rate(hour)) is None else round(rate * 3600, 3) for hour in range(HOURS)]
+
+    def as_storage(self) -> dict[str, Any]:
+        return {"seconds": list(self._seconds), "changes": list(self._changes)}
+
+    def restore(self, data: dict[str, Any] | None) -> None:
+        if not data:
+            return
+        seconds, changes = data.get("seconds") or [], data.get("changes") or []
+        if len(seconds) == HOURS and len(changes) == HOURS:
+            self._seconds = array("d", seconds)
+            self._changes = array("d", changes)
@@ -1,128 +1,293 @@
 import logging
-from typing import Any
-
-from homeassistant.components.sensor import SensorEntity
+import time
+from typing import Any, Callable
+
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
+from .aggregates import company_key
 from .const import DOMAIN
+from .spatial import zone_location
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def _safe_get(d: dict | list | None, *keys, default=None):
-    if d is None:
-        return default
-    if isinstance(d, list):
-        return d
-    for k in keys:
-        if isinstance(d, dict) and k in d:
-            return d[k]
-    return default
-
-
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up sensors from config entry coordinator data."""
-    _LOGGER.warning("sensor.async_setup_entry called for %s", entry.entry_id)
+    _LOGGER.debug("sensor.async_setup_entry called for %s", entry.entry_id)
     entry_data = hass.data.get(DOMAIN, {}).get(entry.entry_id)
     if not entry_data:
         _LOGGER.error("No coordinator for entry %s", entry.entry_id)
         return
 
     coordinator = entry_data["coordinator"]
-    created = False
-
-    async def _create_entities():
-        nonlocal created
-        if created:
-            return
-        data = coordinator.data
-        if not data:
-            _LOGGER.warning("No data available in coordinator for entry %s during entity creation", entry.entry_id)
-            return
-            return
+    manager = FuelEntityManager(hass, entry, coordinator, async_add_entities)
+    entry_data["entities"] = manager
 
-        # Determine companies list (support multiple API shapes)
-        def _extract_companies(d):
-            if isinstance(d, dict):
-                for k in ("Companies", "companies", "companiesList", "priceInfo", "PriceInfo"):
-                    v = _safe_get(d, k, default=None)
-                    if isinstance(v, list):
-                        return v
-                if isinstance(d.get("data"), dict):
-                    for k in ("priceInfo", "Companies", "companies", "companiesList"):
-                        v = _safe_get(d.get("data"), k, default=None)
-                        if isinstance(v, list):
-                            return v
-            if isinstance(d, list):
-                return d
-            return None
+    # Register listener so we create entities once data arrives (non-blocking),
+    # and again when the feed brings a fuel type or station we have no sensors for
+    def _on_update():
+        if manager.needs_reconcile(coordinator.data):
+            hass.async_create_task(manager.async_reconcile())
 
-        companies = _extract_companies(data)
+    entry.async_on_unload(coordinator.async_add_listener(_on_update))
 
-        if not companies:
-            _LOGGER.warning("Unable to find companies/stations structure in data for entry %s", entry.entry_id)
+    # Attempt immediate creation in case data already present
+    await manager.async_reconcile()
+
+
+class FuelEntityManager:
+    """Create and retire the sensors of one entry to match its options.
+
+    The ``companies``, ``stations`` and ``fuel_types`` options narrow the
+    sensors down (an empty list means all), together with the geofence.
+    ``async_reconcile`` diffs the wanted sensors against the live ones and
+    only adds or removes the difference, so changing the selection does
+    not reload the entry.
+    """
+
+    def __init__(self, hass, entry, coordinator, async_add_entities) -> None:
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        self._async_add_entities = async_add_entities
+        self.entities: dict[str, SensorEntity] = {}
+        self.created = False
+        # fuel types and stations the live sensors were created for
+        self._fuel_types: set[str] = set()
+        self._stations: set[str] = set()
+
+    def needs_reconcile(self, snapshot) -> bool:
+        if not snapshot:
+            return False
+        return (
+            not self.created
+            or not snapshot.fuel_types.keys() <= self._fuel_types
+            or not snapshot.stations.keys() <= self._stations
+        )
+
+    @callback
+    def async_forget_fuel_types(self, fuel_type_ids: set[str]) -> None:
+        """Drop the sensors of fuel types whose device was removed with its entities."""
+        prefixes = tuple(f"{self.entry.entry_id}_{fuel_type_id}_" for fuel_type_id in fuel_type_ids)
+        for unique_id in [unique_id for unique_id in self.entities if unique_id.startswith(prefixes)]:
+            del self.entities[unique_id]
+        self._fuel_types -= fuel_type_ids
+
+    def _station_filter(self, snapshot) -> Callable[[str], bool] | None:
+        """Return a station id predicate, or None while the geofence cannot be applied yet."""
+        options = self.entry.options
+        companies = set(options.get("companies") or ())
+        stations = set(options.get("stations") or ())
+
+        # optional geofence: only materialize stations near a zone
+        allowed: set[str] | None = None
+        radius = options.get("geofence_radius", 0)
+        if radius > 0:
+            location = zone_location(self.hass, options.get("geofence_zone"))
+            if location is None:
+                _LOGGER.debug("Geofence zone %s has no location yet for entry %s", options.get("geofence_zone"), self.entry.entry_id)
+                return None
+            if not self.coordinator.grid:
+                # nothing to measure against; don't retire every station sensor
+                _LOGGER.debug("No station coordinates for the geofence of entry %s", self.entry.entry_id)
+                return None
+            allowed = {station.id for station, _dist in self.coordinator.grid.within(*location, radius)}
+
+        station_map = snapshot.stations
+
+        def _wanted(station_id: str) -> bool:
+            if allowed is not None and station_id not in allowed:
+                return False
+            if stations and station_id not in stations:
+                return False
+            return not companies or station_map[station_id].company in companies
+
+        return _wanted
+
+    async def async_reconcile(self) -> None:
+        snapshot = self.coordinator.data
+        if not snapshot:
+            _LOGGER.debug("No data available in coordinator for entry %s during entity creation", self.entry.entry_id)
+            return
+        station_wanted = self._station_filter(snapshot)
+        if station_wanted is None:
             return
 
-        entities: list[FuelStationSensor] = []
-
-        _LOGGER.warning("Found %s companies in data for entry %s", (len(companies) if hasattr(companies, '__len__') else 'unknown'), entry.entry_id)
-        for comp in companies:
-            stations = _safe_get(comp, "Stations", "stations", "stationInfos", "stationinfos", default=None)
-            if stations is None and isinstance(comp, dict) and any(k in comp for k in ("Id", "id", "stationId", "DisplayName", "displayName")):
-                stations = [comp]
-            if not stations:
+        entry_id = self.entry.entry_id
+        fuel_types = set(self.entry.options.get("fuel_types") or ())
+        companies = set(self.entry.options.get("companies") or ())
+        selected = bool(companies or self.entry.options.get("stations"))
+        coordinator = self.coordinator
+        live = self.entities
+        # unique ids the snapshot could produce that the selection leaves out
+        excluded: set[str] = set()
+        # registry entries disabled by the integration, by unique id
+        disabled = self._disabled_by_integration() if selected else {}
+        # entity ids of selected sensors to register again, enabled
+        reregister: list[str] = []
+        entities: list[SensorEntity] = []
+        device_infos: dict[str, DeviceInfo] = {}
+
+        def _device_info(fuel_type_id: str) -> DeviceInfo:
+            # one DeviceInfo per fuel type, shared by every sensor of that type
+            info = device_infos.get(fuel_type_id)
+            if info is None:
+                info = device_infos[fuel_type_id] = DeviceInfo(
+                    identifiers={(DOMAIN, f"fuel_type_{fuel_type_id}")},
+                    name=snapshot.fuel_types[fuel_type_id],
+                    manufacturer="FuelEstonia",
+                )
+            return info
+
+        wanted_station: dict[str, bool] = {}
+        for key, price in snapshot.items():
+            station_id, fuel_type_id = key
+            unique_id = f"{entry_id}_{fuel_type_id}_{station_id}"
+            wanted = wanted_station.get(station_id)
+            if wanted is None:
+                wanted = wanted_station[station_id] = station_wanted(station_id)
+            if not wanted or (fuel_types and fuel_type_id not in fuel_types):
+                excluded.add(unique_id)
+                continue
+            if unique_id in disabled:
+                reregister.append(disabled[unique_id])
+                live.pop(unique_id, None)
+            if unique_id in live:
                 continue
-            for station in stations:
-                station_id = _safe_get(station, "Id", "id", "stationId", default=None)
-                station_name = _safe_get(station, "DisplayName", "displayName", "displayname", "Name", default=str(station_id))
-                fuels = _safe_get(station, "Fuels", "fuels", "Prices", "fuelInfos", "fuelinfos", default=None)
-                if not fuels:
+            station_name = snapshot.stations[station_id].name
+            entity = FuelStationSensor(
+                coordinator,
+                unique_id,
+                f"{station_name} - {snapshot.fuel_name(key)}",
+                price,
+                _device_info(fuel_type_id),
+                station_id,
+                fuel_type_id,
+            )
+            if selected:
+                # an explicit selection is what the user wants to see
+                entity._attr_entity_registry_enabled_default = True
+            live[unique_id] = entity
+            entities.append(entity)
+
+        # country-wide statistics per fuel type, attached to the fuel type devices
+        for fuel_type_id, fuel_type_name in snapshot.fuel_types.items():
+            for stat in AGGREGATE_STATS:
+                unique_id = f"{entry_id}_{fuel_type_id}_aggregate_{stat}"
+                if fuel_types and fuel_type_id not in fuel_types:
+                    excluded.add(unique_id)
+                elif unique_id not in live:
+                    entity = FuelAggregateSensor(coordinator, entry_id, fuel_type_id, fuel_type_name, stat, _device_info(fuel_type_id))
+                    live[unique_id] = entity
+                    entities.append(entity)
+
+        # cheapest price per fuel type at each company
+        for company_id in snapshot.companies:
+            for fuel_type_id, fuel_type_name in snapshot.fuel_types.items():
+                key = company_key(company_id, fuel_type_id)
+                if coordinator.aggregates.get(key) is None:
                     continue
-                for fuel in fuels:
-                    fuel_type_id = _safe_get(fuel, "FuelTypeId", "fuelTypeId", "FuelType", "fuelType", "Id", "id", default=None)
-                    fuel_type_name = _safe_get(fuel, "FuelTypeName", "FuelName", "name", "Name", default=str(fuel_type_id))
-                    price = _safe_get(fuel, "Price", "price", default=None)
-                    # normalize price to float when possible
-                    try:
-                        price = float(price) if price is not None else None
-                    except Exception:
-                        price = None
-
-                    if fuel_type_id is None or station_id is None:
-                        _LOGGER.warning("Skipping fuel/station with missing id (fuel=%s, station=%s)", fuel, station)
-                        continue
-
-                    device_identifier = f"fuel_type_{fuel_type_id}"
-                    device_info = {
-                        "identifiers": {(DOMAIN, device_identifier)},
-                        "name": f"{fuel_type_name}",
-                        "manufacturer": "FuelEstonia",
-                    }
-
-                    unique_id = f"{entry.entry_id}_{fuel_type_id}_{station_id}"
-                    name = f"{station_name} - {fuel_type_name}"
-
-                    entities.append(FuelStationSensor(coordinator, unique_id, name, price, device_info))
-
+                unique_id = f"{entry_id}_{fuel_type_id}_company_{company_id}"
+                if (companies and company_id not in companies) or (fuel_types and fuel_type_id not in fuel_types):
+                    excluded.add(unique_id)
+                    continue
+                if companies and unique_id in disabled:
+                    reregister.append(disabled[unique_id])
+                    live.pop(unique_id, None)
+                if unique_id not in live:
+                    entity = FuelCompanySensor(
+                        coordinator,
+                        entry_id,
+                        company_id,
+                        coordinator.company_name(company_id),
+                        fuel_type_id,
+                        fuel_type_name,
+                        _device_info(fuel_type_id),
+                    )
+                    if companies:
+                        entity._attr_entity_registry_enabled_default = True
+                    live[unique_id] = entity
+                    entities.append(entity)
+
+        if coordinator.scheduler is not None and "update_interval" not in live:
+            entity = FuelUpdateIntervalSensor(coordinator, entry_id)
+            live["update_interval"] = entity
+            entities.append(entity)
+
+        if coordinator.statistics is not None:
+            # long-term statistics follow the same selection as the sensors
+            coordinator.statistics.selects = lambda key: wanted_station.get(key[0], False) and (
+                not fuel_types or key[1] in fuel_types
+            )
+
+        self._async_remove(excluded)
+        self._async_reregister(reregister)
         if entities:
-            _LOGGER.warning("Creating %s sensor entities for entry %s", len(entities), entry.entry_id)
-            async_add_entities(entities, True)
-            created = True
-
-    # Register listener so we create entities once data arrives (non-blocking)
-    coordinator.async_add_listener(lambda: hass.async_create_task(_create_entities()))
-
-    # Attempt immediate creation in case data already present
-    await _create_entities()
+            _LOGGER.debug("Creating %s sensor entities for entry %s", len(entities), entry_id)
+            # they carry their state from the snapshot; no extra refresh
+            self._async_add_entities(entities, False)
+        self._fuel_types = set(snapshot.fuel_types)
+        self._stations = set(snapshot.stations)
+        self.created = True
+
+    def _disabled_by_integration(self) -> dict[str, str]:
+        """Map unique ids of registry entries disabled by default to their entity ids."""
+        registry = er.async_get(self.hass)
+        return {
+            reg_entry.unique_id: reg_entry.entity_id
+            for reg_entry in er.async_entries_for_config_entry(registry, self.entry.entry_id)
+            if reg_entry.disabled_by is er.RegistryEntryDisabler.INTEGRATION
+        }
+
+    def _async_reregister(self, entity_ids: list[str]) -> None:
+        """Drop the registry entries of selected sensors that are disabled by default.
+
+        ``entity_registry_enabled_default`` only applies when the registry
+        entry is created, so a sensor registered before it was selected
+        would stay disabled. Enabling the entry in place makes HA reload
+        the whole config entry; removing it lets the sensor created for
+        the selection register again, enabled.
+        """
+        if not entity_ids:
+            return
+        registry = er.async_get(self.hass)
+        for entity_id in entity_ids:
+            registry.async_remove(entity_id)
+        _LOGGER.debug("Re-registering %s selected sensor entities for entry %s", len(entity_ids), self.entry.entry_id)
+
+    def _async_remove(self, excluded: set[str]) -> None:
+        """Drop excluded sensors from the entity registry, which also removes live ones."""
+        if not excluded:
+            return
+        registry = er.async_get(self.hass)
+        removed = 0
+        for reg_entry in er.async_entries_for_config_entry(registry, self.entry.entry_id):
+            if reg_entry.unique_id in excluded:
+                registry.async_remove(reg_entry.entity_id)
+                removed += 1
+        for unique_id in excluded:
+            entity = self.entities.pop(unique_id, None)
+            if entity is not None and entity.registry_entry is None and entity.hass is not None:
+                self.hass.async_create_task(entity.async_remove())
+        if removed:
+            _LOGGER.debug("Removed %s deselected sensor entities for entry %s", removed, self.entry.entry_id)
 
 
 class FuelStationSensor(CoordinatorEntity, SensorEntity):
     """Sensor representing price of a fuel at a station."""
 
-    entity_registry_enabled_default = False
+    _attr_entity_registry_enabled_default = False
 
-    def __init__(self, coordinator, unique_id: str, name: str, price: Any, device_info: dict):
-        super().__init__(coordinator)
+    def __init__(self, coordinator, unique_id: str, name: str, price: Any, device_info: DeviceInfo, station_id: str, fuel_type_id: str):
+        # the snapshot key doubles as listener context so the coordinator
+        # only dispatches updates to sensors whose price changed
+        self._key = (station_id, fuel_type_id)
+        super().__init__(coordinator, context=self._key)
         self._attr_name = name
         self._attr_unique_id = unique_id
         self._attr_icon = "mdi:fuel"
@@ -143,68 +308,133 @@ class FuelStationSensor(CoordinatorEntity, SensorEntity):
     def available(self) -> bool:
         return self._state is not None
 
+    @property
+    def extra_state_attributes(self):
+        return self.coordinator.history.stats(self._key, time.time())
+
     @property
     def device_info(self):
         return self._device_info
 
     def _handle_coordinator_update(self) -> None:
         """Update the entity state when coordinator data changes."""
-        # On each update, attempt to refresh our value from coordinator data
-        data = self.coordinator.data
-        # Attempt to find our price by scanning data (support multiple API shapes)
-        found = None
-
-        def _extract_companies(d):
-            if isinstance(d, dict):
-                # top-level shapes: Companies, priceInfo or nested under data
-                for k in ("Companies", "companies", "companiesList", "priceInfo", "PriceInfo"):
-                    v = _safe_get(d, k, default=None)
-                    if isinstance(v, list):
-                        return v
-                if isinstance(d.get("data"), dict):
-                    for k in ("priceInfo", "Companies", "companies", "companiesList"):
-                        v = _safe_get(d.get("data"), k, default=None)
-                        if isinstance(v, list):
-                            return v
-            if isinstance(d, list):
-                return d
+        snapshot = self.coordinator.data
+        self._state = snapshot.get(self._key) if snapshot else None
+        self.async_write_ha_state()
+
+
+AGGREGATE_STATS = {
+    "min": "min price",
+    "max": "max price",
+    "median": "median price",
+    "mean": "mean price",
+}
+
+
+class FuelAggregateSensor(CoordinatorEntity, SensorEntity):
+    """Min, max, median or mean price of one fuel type across all stations.
+
+    ``aggregate_key`` selects another ``FuelAggregates`` group, such as one
+    company's stations.
+    """
+
+    def __init__(
+        self,
+        coordinator,
+        entry_id: str,
+        fuel_type_id: str,
+        fuel_type_name: str,
+        stat: str,
+        device_info: DeviceInfo,
+        aggregate_key: Any = None,
+    ):
+        # the aggregate key is the listener context; see FuelEstoniaCoordinator
+        self._aggregate_key = aggregate_key if aggregate_key is not None else fuel_type_id
+        super().__init__(coordinator, context=self._aggregate_key)
+        self._stat = stat
+        self._attr_name = f"{fuel_type_name} {AGGREGATE_STATS[stat]}"
+        self._attr_unique_id = f"{entry_id}_{fuel_type_id}_aggregate_{stat}"
+        self._attr_icon = "mdi:gas-station"
+        self._attr_native_unit_of_measurement = "EUR"
+        self._device_info = device_info
+        self._stats = coordinator.aggregates.get(self._aggregate_key)
+
+    @property
+    def native_value(self):
+        if self._stats is None:
             return None
+        return f"{self._stats[self._stat]:.3f}"
 
-        companies = _extract_companies(data)
-
-        if companies:
-            # unique_id format: entryid_fuelid_stationid
-            parts = self.unique_id.split("_")
-            if len(parts) >= 3:
-                fuel_id = parts[-2]
-                station_id = parts[-1]
-                for comp in companies:
-                    stations = _safe_get(comp, "Stations", "stations", "stationInfos", "stationinfos", default=None)
-                    if stations is None and isinstance(comp, dict) and any(k in comp for k in ("Id", "id", "stationId", "DisplayName", "displayName")):
-                        stations = [comp]
-                    if not stations:
-                        continue
-                    for station in stations:
-                        sid = _safe_get(station, "Id", "id", "stationId", default=None)
-                        if str(sid) != str(station_id):
-                            continue
-                        fuels = _safe_get(station, "Fuels", "fuels", "Prices", "fuelInfos", "fuelinfos", default=None)
-                        if not fuels:
-                            continue
-                        for fuel in fuels:
-                            fid = _safe_get(fuel, "FuelTypeId", "fuelTypeId", "FuelType", "fuelType", "Id", "id", default=None)
-                            price = _safe_get(fuel, "Price", "price", default=None)
-                            if str(fid) == str(fuel_id):
-                                found = price
-                                break
-                        if found is not None:
-                            break
-                    if found is not None:
-                        break
-
-        # normalize found to float when possible
-        try:
-            self._state = float(found) if found is not None else None
-        except Exception:
-            self._state = None
+    @property
+    def available(self) -> bool:
+        return self._stats is not None
+
+    @property
+    def extra_state_attributes(self):
+        if self._stats is None:
+            return None
+        attrs = {"station_count": self._stats["count"]}
+        if self._stat == "min":
+            station_id = self._stats["min_station_id"]
+            snapshot = self.coordinator.data
+            station = snapshot.stations.get(station_id) if snapshot else None
+            attrs["station_id"] = station_id
+            attrs["station_name"] = station.name if station else None
+        return attrs
+
+    @property
+    def device_info(self):
+        return self._device_info
+
+    def _handle_coordinator_update(self) -> None:
+        self._stats = self.coordinator.aggregates.get(self._aggregate_key)
         self.async_write_ha_state()
+
+
+class FuelCompanySensor(FuelAggregateSensor):
+    """Cheapest price of one fuel type at the stations of one company."""
+
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        coordinator,
+        entry_id: str,
+        company_id: str,
+        company_name: str,
+        fuel_type_id: str,
+        fuel_type_name: str,
+        device_info: DeviceInfo,
+    ):
+        super().__init__(
+            coordinator, entry_id, fuel_type_id, fuel_type_name, "min", device_info, company_key(company_id, fuel_type_id)
+        )
+        self._attr_name = f"{company_name} cheapest {fuel_type_name}"
+        self._attr_unique_id = f"{entry_id}_{fuel_type_id}_company_{company_id}"
+
+
+class FuelUpdateIntervalSensor(CoordinatorEntity, SensorEntity):
+    """Polling interval currently chosen by the adaptive scheduler."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_icon = "mdi:timer-sync-outline"
+
+    def __init__(self, coordinator, entry_id: str):
+        super().__init__(coordinator)
+        self._attr_name = "Fuel Estonia update interval"
+        self._attr_unique_id = f"{entry_id}_update_interval"
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        # the interval moves on refreshes that change no data and wake no listener
+        self.async_on_remove(self.coordinator.async_add_interval_listener(self.async_write_ha_state))
+
+    @property
+    def native_value(self):
+        return round(self.coordinator.scheduler.current)
+
+    @property
+    def extra_state_attributes(self):
+        return {"changes_per_hour": self.coordinator.scheduler.profile()}
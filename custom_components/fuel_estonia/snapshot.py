@@ -0,0 +1,783 @@
+"""Normalization of the fuelest.ee price feed into a per-refresh snapshot."""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass, field
+import logging
+import sys
+from typing import Any, Callable, Iterable, Iterator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _safe_get(d: dict | list | None, *keys, default=None):
+    if d is None:
+        return default
+    if isinstance(d, list):
+        return d
+    for k in keys:
+        if isinstance(d, dict) and k in d:
+            return d[k]
+    return default
+
+
+def _extract_companies(d):
+    """Return the list of companies (or stations) from any supported API shape."""
+    if isinstance(d, dict):
+        for k in ("Companies", "companies", "companiesList", "priceInfo", "PriceInfo"):
+            v = d.get(k)
+            if isinstance(v, list):
+                return v
+        # nested under 'data'
+        if isinstance(d.get("data"), dict):
+            for k in ("priceInfo", "Companies", "companies", "companiesList"):
+                v = d["data"].get(k)
+                if isinstance(v, list):
+                    return v
+    if isinstance(d, list):
+        return d
+    return None
+
+
+def _to_company(value: Any) -> str | None:
+    return str(value) if value is not None else None
+
+
+def _to_coord(value: Any) -> float | None:
+    try:
+        coord = float(value) if value is not None else None
+    except Exception:
+        return None
+    # 0/0 is what some feeds send for "unknown"
+    return coord if coord else None
+
+
+def _to_price(value: Any) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except Exception:
+        return None
+
+
+@dataclass(slots=True)
+class Station:
+    """A single fuel station as seen in the feed.
+
+    ``start`` and ``count`` locate the station's rows in the snapshot's
+    price columns.
+    """
+
+    id: str
+    name: str
+    start: int = 0
+    count: int = 0
+    latitude: float | None = None
+    longitude: float | None = None
+    company: str | None = None
+
+
+_NAN = float("nan")
+
+
+class FuelSnapshot:
+    """Prices from one refresh keyed by (station_id, fuel_type_id).
+
+    All ids are stored as strings so lookups do not depend on whether the
+    upstream sent numbers or strings. Prices are kept column-wise in
+    arrays: one row per station/fuel pair holding the price (NaN when
+    missing), a fuel type code and a fuel name code. A station's rows are
+    contiguous, so a lookup is a dict hit on the station plus a scan over
+    its handful of fuels. ``companies`` maps each company id to its station
+    ids in feed order.
+    """
+
+    __slots__ = (
+        "stations",
+        "fuel_types",
+        "companies",
+        "_prices",
+        "_fuel_col",
+        "_name_col",
+        "_fuel_ids",
+        "_fuel_codes",
+        "_names",
+        "_name_codes",
+        "_extra",
+    )
+
+    def __init__(self) -> None:
+        self.stations: dict[str, Station] = {}
+        self.fuel_types: dict[str, str] = {}
+        self.companies: dict[str, list[str]] = {}
+        self._prices = array("d")
+        self._fuel_col = array("H")
+        self._name_col = array("H")
+        self._fuel_ids: list[str] = []
+        self._fuel_codes: dict[str, int] = {}
+        self._names: list[str] = []
+        self._name_codes: dict[str, int] = {}
+        # rows of stations listed again after another station started
+        self._extra: dict[tuple[str, str], int] = {}
+
+    def add_station(
+        self,
+        station_id: str,
+        name: str,
+        latitude: float | None = None,
+        longitude: float | None = None,
+        company: str | None = None,
+    ) -> None:
+        """Record a station unless it was already seen in this payload."""
+        if station_id not in self.stations:
+            station_id = sys.intern(station_id)
+            if company is not None:
+                company = sys.intern(company)
+                members = self.companies.get(company)
+                if members is None:
+                    members = self.companies[company] = []
+                members.append(station_id)
+            self.stations[station_id] = Station(station_id, sys.intern(name), len(self._prices), 0, latitude, longitude, company)
+
+    def add_price(self, station_id: str, fuel_type_id: str, fuel_name: str, price: float | None) -> None:
+        """Store the price of a fuel at a known station; a repeated pair overwrites."""
+        code = self._fuel_codes.get(fuel_type_id)
+        if code is None:
+            fuel_type_id = sys.intern(fuel_type_id)
+            code = self._fuel_codes[fuel_type_id] = len(self._fuel_ids)
+            self._fuel_ids.append(fuel_type_id)
+            self.fuel_types[fuel_type_id] = sys.intern(fuel_name)
+        name_code = self._name_codes.get(fuel_name)
+        if name_code is None:
+            fuel_name = sys.intern(fuel_name)
+            name_code = self._name_codes[fuel_name] = len(self._names)
+            self._names.append(fuel_name)
+        value = _NAN if price is None else price
+
+        station = self.stations[station_id]
+        row = self._find_row(station, code)
+        if row is None:
+            row = len(self._prices)
+            self._prices.append(value)
+            self._fuel_col.append(code)
+            self._name_col.append(name_code)
+            if station.start + station.count == row:
+                station.count += 1
+            else:
+                self._extra[(station.id, self._fuel_ids[code])] = row
+            return
+        self._prices[row] = value
+        self._name_col[row] = name_code
+
+    def _find_row(self, station: Station, code: int) -> int | None:
+        fuel_col = self._fuel_col
+        for row in range(station.start, station.start + station.count):
+            if fuel_col[row] == code:
+                return row
+        if self._extra:
+            return self._extra.get((station.id, self._fuel_ids[code]))
+        return None
+
+    def _row(self, key: tuple[str, str]) -> int | None:
+        station = self.stations.get(key[0])
+        code = self._fuel_codes.get(key[1])
+        if station is None or code is None:
+            return None
+        return self._find_row(station, code)
+
+    def get(self, key: tuple[str, str]) -> float | None:
+        """Return the price for a (station_id, fuel_type_id) key or None."""
+        row = self._row(key)
+        if row is None:
+            return None
+        value = self._prices[row]
+        return None if value != value else value
+
+    def price(self, station_id: str, fuel_type_id: str) -> float | None:
+        """Return the price for a station/fuel pair or None when missing."""
+        return self.get((station_id, fuel_type_id))
+
+    def fuel_name(self, key: tuple[str, str]) -> str:
+        """Return the fuel name the station reported for this key."""
+        row = self._row(key)
+        return key[1] if row is None else self._names[self._name_col[row]]
+
+    def _rows(self) -> Iterator[tuple[tuple[str, str], int]]:
+        fuel_ids = self._fuel_ids
+        fuel_col = self._fuel_col
+        for station in self.stations.values():
+            sid = station.id
+            for row in range(station.start, station.start + station.count):
+                yield (sid, fuel_ids[fuel_col[row]]), row
+        yield from self._extra.items()
+
+    def keys(self) -> Iterator[tuple[str, str]]:
+        """Yield (station_id, fuel_type_id) keys in feed order."""
+        for key, _row in self._rows():
+            yield key
+
+    def items(self) -> Iterator[tuple[tuple[str, str], float | None]]:
+        """Yield ((station_id, fuel_type_id), price) pairs in feed order."""
+        prices = self._prices
+        for key, row in self._rows():
+            value = prices[row]
+            yield key, (None if value != value else value)
+
+    def as_storage(self) -> dict[str, Any]:
+        """Return a JSON-serializable form for ``homeassistant.helpers.storage``."""
+        prices = []
+        for (sid, fid), row in self._rows():
+            value = self._prices[row]
+            prices.append([sid, fid, self._names[self._name_col[row]], None if value != value else value])
+        return {
+            "stations": {
+                station.id: [station.name, station.latitude, station.longitude, station.company]
+                for station in self.stations.values()
+            },
+            "prices": prices,
+        }
+
+    @classmethod
+    def from_storage(cls, data: dict[str, Any]) -> FuelSnapshot:
+        """Rebuild a snapshot saved with ``as_storage``."""
+        snapshot = cls()
+        stations = data.get("stations", {})
+        for sid, fid, fname, price in data.get("prices", []):
+            if sid not in snapshot.stations:
+                snapshot.add_station(sid, *(stations.get(sid) or (sid,)))
+            snapshot.add_price(sid, fid, fname, price)
+        return snapshot
+
+    @classmethod
+    def merge(cls, snapshots: Iterable[FuelSnapshot]) -> FuelSnapshot:
+        """Combine snapshots of several feeds; the first to list a station or price wins."""
+        merged = cls()
+        stations = merged.stations
+        for snapshot in snapshots:
+            names, name_col, prices = snapshot._names, snapshot._name_col, snapshot._prices
+            # stations this snapshot introduced cannot clash with earlier ones
+            own: set[str] = set()
+            for (sid, fid), row in snapshot._rows():
+                if sid not in stations:
+                    station = snapshot.stations[sid]
+                    merged.add_station(sid, station.name, station.latitude, station.longitude, station.company)
+                    own.add(sid)
+                elif sid not in own and (sid, fid) in merged:
+                    continue
+                value = prices[row]
+                merged.add_price(sid, fid, names[name_col[row]], None if value != value else value)
+            for station in snapshot.stations.values():
+                if station.id not in stations:
+                    merged.add_station(station.id, station.name, station.latitude, station.longitude, station.company)
+        return merged
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, tuple) and len(key) == 2 and self._row(key) is not None
+
+    def __len__(self) -> int:
+        return len(self._prices)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, FuelSnapshot):
+            return NotImplemented
+        if self is other:
+            return True
+        # compare raw bytes so NaN placeholders compare equal
+        return (
+            self._prices.tobytes() == other._prices.tobytes()
+            and self._fuel_col == other._fuel_col
+            and self._name_col == other._name_col
+            and self._fuel_ids == other._fuel_ids
+            and self._names == other._names
+            and self.stations == other.stations
+            and self._extra == other._extra
+        )
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return f"<FuelSnapshot stations={len(self.stations)} fuel_types={len(self.fuel_types)} prices={len(self)}>"
+
+
+def build_snapshot(data: Any) -> FuelSnapshot | None:
+    """Walk the raw payload once and return a normalized snapshot.
+
+    This is the generic path: every level probes all known key variants.
+    Prefer ``SnapshotParser`` which only does that on the first payload.
+
+    Returns None when the payload does not contain a recognizable
+    companies/stations structure.
+    """
+    companies = _extract_companies(data)
+    if not companies:
+        return None
+
+    snapshot = FuelSnapshot()
+    for comp in companies:
+        stations = _safe_get(comp, "Stations", "stations", "stationInfos", "stationinfos", default=None)
+        company = _safe_get(comp, *_COMPANY_ID_KEYS, default=None)
+        if stations is None and isinstance(comp, dict) and any(k in comp for k in ("Id", "id", "stationId", "DisplayName", "displayName")):
+            stations = [comp]
+            company = _safe_get(comp, *_STATION_COMPANY_KEYS, default=None)
+        if not stations:
+            continue
+        for station in stations:
+            station_id = _safe_get(station, "Id", "id", "stationId", default=None)
+            fuels = _safe_get(station, "Fuels", "fuels", "Prices", "fuelInfos", "fuelinfos", default=None)
+            if station_id is None or not fuels:
+                continue
+            sid = str(station_id)
+            if sid not in snapshot.stations:
+                snapshot.add_station(
+                    sid,
+                    str(_safe_get(station, "DisplayName", "displayName", "displayname", "Name", default=sid)),
+                    _to_coord(_safe_get(station, *_LATITUDE_KEYS, default=None)),
+                    _to_coord(_safe_get(station, *_LONGITUDE_KEYS, default=None)),
+                    _to_company(company),
+                )
+            for fuel in fuels:
+                fuel_type_id = _safe_get(fuel, "FuelTypeId", "fuelTypeId", "FuelType", "fuelType", "Id", "id", default=None)
+                if fuel_type_id is None:
+                    continue
+                fid = str(fuel_type_id)
+                fuel_type_name = str(_safe_get(fuel, "FuelTypeName", "FuelName", "name", "Name", default=fid))
+                snapshot.add_price(sid, fid, fuel_type_name, _to_price(_safe_get(fuel, "Price", "price", default=None)))
+
+    return snapshot
+
+
+def build_snapshot_streaming(body: bytes) -> FuelSnapshot | None:
+    """Build a snapshot from raw JSON bytes without materializing the payload.
+
+    The body is walked as a stream of parser events. Only the scalar fields
+    of the object currently open at each level are kept, so peak memory is
+    the body plus the snapshot rather than the full decoded object graph.
+    Any object holding a non-empty fuels array is treated as a station,
+    which covers every shape ``build_snapshot`` accepts. Stations under a
+    company are held until the company closes, since its id may come after
+    the stations array.
+    """
+    import ijson
+
+    snapshot = FuelSnapshot()
+    add_price = snapshot.add_price
+
+    def _add(station_id: Any, scalars: dict[str, Any], fuels: list[tuple[str, str, Any]], company: Any) -> None:
+        sid = str(station_id)
+        if sid not in snapshot.stations:
+            snapshot.add_station(
+                sid,
+                str(_safe_get(scalars, *_STATION_NAME_KEYS, default=sid)),
+                _to_coord(_safe_get(scalars, *_LATITUDE_KEYS, default=None)),
+                _to_coord(_safe_get(scalars, *_LONGITUDE_KEYS, default=None)),
+                _to_company(company),
+            )
+        for fid, fname, price in fuels:
+            add_price(sid, fid, fname, _to_price(price))
+
+    # one frame per open container: (key it sits under, scalars or None for
+    # arrays, fuels, stations waiting for their company)
+    stack: list[tuple[str | None, dict[str, Any] | None, list[tuple[str, str, Any]], list]] = []
+    key: str | None = None
+    for event, value in ijson.basic_parse(body, use_float=True):
+        if event == "map_key":
+            key = value
+        elif event == "start_map":
+            stack.append((key, {}, [], []))
+            key = None
+        elif event == "start_array":
+            stack.append((key, None, [], []))
+            key = None
+        elif event == "end_array":
+            stack.pop()
+        elif event == "end_map":
+            _owner, scalars, fuels, pending = stack.pop()
+            if pending:
+                company = _safe_get(scalars, *_COMPANY_ID_KEYS, default=None)
+                for station in pending:
+                    _add(*station, company)
+            if len(stack) >= 2 and stack[-1][1] is None and stack[-1][0] in _FUELS_KEYS and stack[-2][1] is not None:
+                # fuel entry: hand it to the enclosing station
+                fuel_type_id = _safe_get(scalars, *_FUEL_ID_KEYS, default=None)
+                if fuel_type_id is None:
+                    continue
+                fid = str(fuel_type_id)
+                fname = str(_safe_get(scalars, *_FUEL_NAME_KEYS, default=fid))
+                stack[-2][2].append((fid, fname, _safe_get(scalars, *_PRICE_KEYS, default=None)))
+            elif fuels:
+                station_id = _safe_get(scalars, *_STATION_ID_KEYS, default=None)
+                if station_id is None:
+                    continue
+                if len(stack) >= 2 and stack[-1][0] in _STATIONS_KEYS and stack[-2][1] is not None:
+                    stack[-2][3].append((station_id, scalars, fuels))
+                else:
+                    _add(station_id, scalars, fuels, _safe_get(scalars, *_STATION_COMPANY_KEYS, default=None))
+        elif stack and stack[-1][1] is not None:
+            stack[-1][1][key] = value
+
+    return snapshot if snapshot.stations else None
+
+
+@dataclass
+class PriceDiff:
+    """Price changes between two consecutive snapshots.
+
+    ``changed`` maps each (station_id, fuel_type_id) whose price differs,
+    appeared or disappeared to its (old, new) price.
+    """
+
+    changed: dict[tuple[str, str], tuple[float | None, float | None]] = field(default_factory=dict)
+    unchanged: int = 0
+
+    @property
+    def changed_count(self) -> int:
+        return len(self.changed)
+
+
+def diff_snapshots(old: FuelSnapshot | None, new: FuelSnapshot | None) -> PriceDiff:
+    """Compare two snapshots price by price.
+
+    One pass over the new snapshot's stations. When a station's rows hold
+    the same fuel types in the same order as before, its rows are compared
+    as whole column slices; only stations that differ are compared row by
+    row. Old rows are only scanned again when some of them were not matched,
+    i.e. when prices disappeared.
+    """
+    diff = PriceDiff()
+    if new is None:
+        if old is not None:
+            diff.changed = {key: (price, None) for key, price in old.items()}
+        return diff
+    if old is None:
+        diff.changed = {key: (None, price) for key, price in new.items()}
+        return diff
+
+    changed = diff.changed
+    unchanged = 0
+    matched = 0
+    new_prices, old_prices = new._prices, old._prices
+    new_fuel_col, old_fuel_col = new._fuel_col, old._fuel_col
+    fuel_ids = new._fuel_ids
+    same_codes = fuel_ids == old._fuel_ids
+    # new fuel code -> old fuel code (None for fuel types the old snapshot lacks)
+    code_map = None if same_codes else [old._fuel_codes.get(fid) for fid in fuel_ids]
+    old_stations = old.stations
+    old_find_row = old._find_row
+
+    for station in new.stations.values():
+        start, count = station.start, station.count
+        if not count:
+            continue
+        sid = station.id
+        previous = old_stations.get(sid)
+        if previous is None:
+            for row in range(start, start + count):
+                value = new_prices[row]
+                changed[(sid, fuel_ids[new_fuel_col[row]])] = (None, None if value != value else value)
+            continue
+        old_start = previous.start
+        if (
+            same_codes
+            and previous.count == count
+            and new_fuel_col[start : start + count] == old_fuel_col[old_start : old_start + count]
+        ):
+            # same layout: rows pair up by position
+            matched += count
+            if new_prices[start : start + count] == old_prices[old_start : old_start + count]:
+                unchanged += count
+                continue
+            pairs = zip(range(start, start + count), range(old_start, old_start + count))
+        else:
+            pairs = []
+            for row in range(start, start + count):
+                code = new_fuel_col[row]
+                old_code = code if code_map is None else code_map[code]
+                old_row = None if old_code is None else old_find_row(previous, old_code)
+                if old_row is None:
+                    value = new_prices[row]
+                    changed[(sid, fuel_ids[code])] = (None, None if value != value else value)
+                else:
+                    matched += 1
+                    pairs.append((row, old_row))
+        for row, old_row in pairs:
+            value, before = new_prices[row], old_prices[old_row]
+            if value == before or (value != value and before != before):
+                unchanged += 1
+            else:
+                changed[(sid, fuel_ids[new_fuel_col[row]])] = (
+                    None if before != before else before,
+                    None if value != value else value,
+                )
+
+    # rows outside their station's range
+    for key, row in new._extra.items():
+        old_row = old._row(key)
+        value = new_prices[row]
+        if old_row is None:
+            changed[key] = (None, None if value != value else value)
+            continue
+        matched += 1
+        before = old_prices[old_row]
+        if value == before or (value != value and before != before):
+            unchanged += 1
+        else:
+            changed[key] = (None if before != before else before, None if value != value else value)
+
+    if matched < len(old):
+        for key, price in old.items():
+            if key not in new:
+                changed[key] = (price, None)
+    diff.unchanged = unchanged
+    return diff
+
+
+_COMPANIES_PATHS: tuple[tuple[str, ...], ...] = (
+    ("Companies",),
+    ("companies",),
+    ("companiesList",),
+    ("priceInfo",),
+    ("PriceInfo",),
+    ("data", "priceInfo"),
+    ("data", "Companies"),
+    ("data", "companies"),
+    ("data", "companiesList"),
+)
+_STATIONS_KEYS = ("Stations", "stations", "stationInfos", "stationinfos")
+_STATION_LIKE_KEYS = ("Id", "id", "stationId", "DisplayName", "displayName")
+_STATION_ID_KEYS = ("Id", "id", "stationId")
+_STATION_NAME_KEYS = ("DisplayName", "displayName", "displayname", "Name")
+_LATITUDE_KEYS = ("Latitude", "latitude", "Lat", "lat")
+_LONGITUDE_KEYS = ("Longitude", "longitude", "Lng", "lng", "Lon", "lon")
+_COMPANY_ID_KEYS = ("CompanyId", "companyId", "Id", "id")
+_STATION_COMPANY_KEYS = ("CompanyId", "companyId")
+_FUELS_KEYS = ("Fuels", "fuels", "Prices", "fuelInfos", "fuelinfos")
+_FUEL_ID_KEYS = ("FuelTypeId", "fuelTypeId", "FuelType", "fuelType", "Id", "id")
+_FUEL_NAME_KEYS = ("FuelTypeName", "FuelName", "name", "Name")
+_PRICE_KEYS = ("Price", "price")
+
+
+class SchemaMismatch(Exception):
+    """Raised when a payload no longer matches the detected schema."""
+
+
+@dataclass(frozen=True)
+class PayloadSchema:
+    """Key path the upstream uses at each level of the payload.
+
+    ``companies_path`` is empty when the payload itself is the list, and
+    ``stations_key`` is None when the list items are stations rather than
+    companies. ``company_id_key`` is looked up on the company, or on the
+    station when there is no company level. Optional keys are None when
+    not seen.
+    """
+
+    companies_path: tuple[str, ...]
+    stations_key: str | None
+    station_id_key: str
+    station_name_key: str | None
+    latitude_key: str | None
+    longitude_key: str | None
+    company_id_key: str | None
+    fuels_key: str
+    fuel_id_key: str
+    fuel_name_key: str | None
+    price_key: str | None
+
+
+def _first_key(d: Any, keys: tuple[str, ...]) -> str | None:
+    if isinstance(d, dict):
+        for k in keys:
+            if k in d:
+                return k
+    return None
+
+
+def detect_schema(data: Any) -> PayloadSchema | None:
+    """Probe the payload once and record which keys it uses.
+
+    Detection mirrors the generic lookup order in ``build_snapshot`` and
+    looks at the first company, station and fuel that carry the data.
+    """
+    companies_path: tuple[str, ...] | None = None
+    companies = None
+    if isinstance(data, dict):
+        for path in _COMPANIES_PATHS:
+            node = data
+            for k in path:
+                node = node.get(k) if isinstance(node, dict) else None
+            if isinstance(node, list):
+                companies_path, companies = path, node
+                break
+    elif isinstance(data, list):
+        companies_path, companies = (), data
+    if not companies:
+        return None
+
+    for comp in companies:
+        stations_key = _first_key(comp, _STATIONS_KEYS)
+        if stations_key is not None:
+            stations = comp[stations_key]
+        elif _first_key(comp, _STATION_LIKE_KEYS) is not None:
+            stations = [comp]
+        else:
+            continue
+        if not isinstance(stations, list):
+            continue
+        for station in stations:
+            station_id_key = _first_key(station, _STATION_ID_KEYS)
+            fuels_key = _first_key(station, _FUELS_KEYS)
+            if station_id_key is None or fuels_key is None or not station[fuels_key]:
+                continue
+            fuel = station[fuels_key][0]
+            fuel_id_key = _first_key(fuel, _FUEL_ID_KEYS)
+            if fuel_id_key is None:
+                continue
+            return PayloadSchema(
+                companies_path=companies_path,
+                stations_key=stations_key,
+                station_id_key=station_id_key,
+                station_name_key=_first_key(station, _STATION_NAME_KEYS),
+                latitude_key=_first_key(station, _LATITUDE_KEYS),
+                longitude_key=_first_key(station, _LONGITUDE_KEYS),
+                company_id_key=(
+                    _first_key(comp, _COMPANY_ID_KEYS) if stations_key is not None else _first_key(station, _STATION_COMPANY_KEYS)
+                ),
+                fuels_key=fuels_key,
+                fuel_id_key=fuel_id_key,
+                fuel_name_key=_first_key(fuel, _FUEL_NAME_KEYS),
+                price_key=_first_key(fuel, _PRICE_KEYS),
+            )
+    return None
+
+
+def compile_extractor(schema: PayloadSchema) -> Callable[[Any], FuelSnapshot]:
+    """Return an extractor specialized for ``schema``.
+
+    The returned callable indexes the known keys directly and raises
+    ``SchemaMismatch`` when the payload's structure differs. Keys are read
+    directly when a record has the recorded spelling and probed like
+    ``build_snapshot`` otherwise, so a first record without a price or
+    coordinates does not blank that field for the rest of the feed, and a
+    company without stations or a station without an id is skipped rather
+    than failing the whole extract. (A record carrying two spellings of one
+    field gets the recorded one.)
+    """
+    companies_path = schema.companies_path
+    stations_key = schema.stations_key
+    station_id_key = schema.station_id_key
+    station_name_key = schema.station_name_key
+    latitude_key = schema.latitude_key
+    longitude_key = schema.longitude_key
+    company_keys = _COMPANY_ID_KEYS if stations_key is not None else _STATION_COMPANY_KEYS
+    company_id_key = schema.company_id_key
+    fuels_key = schema.fuels_key
+    fuel_id_key = schema.fuel_id_key
+    fuel_name_key = schema.fuel_name_key
+    price_key = schema.price_key
+
+    def _extract(data: Any) -> FuelSnapshot:
+        snapshot = FuelSnapshot()
+        stations_map = snapshot.stations
+        add_station = snapshot.add_station
+        add_price = snapshot.add_price
+        try:
+            companies = data
+            for k in companies_path:
+                companies = companies[k]
+            if not isinstance(companies, list):
+                raise SchemaMismatch("companies is not a list")
+            for comp in companies:
+                if stations_key is None:
+                    if fuels_key not in comp and _first_key(comp, _STATIONS_KEYS) is not None:
+                        # a company among stations; only the generic path reads those
+                        raise SchemaMismatch("company at station level")
+                    stations = (comp,)
+                elif stations_key in comp:
+                    stations = comp[stations_key]
+                else:
+                    stations = _safe_get(comp, *_STATIONS_KEYS)
+                    if stations is None and _first_key(comp, _FUELS_KEYS) is not None:
+                        # a station listed among companies; only the generic path reads those
+                        raise SchemaMismatch("station at company level")
+                if not stations:
+                    continue
+                if stations_key is not None:
+                    company = _to_company(comp[company_id_key] if company_id_key in comp else _safe_get(comp, *company_keys))
+                for station in stations:
+                    fuels = station[fuels_key] if fuels_key in station else _safe_get(station, *_FUELS_KEYS)
+                    if not fuels:
+                        continue
+                    station_id = station[station_id_key] if station_id_key in station else _safe_get(station, *_STATION_ID_KEYS)
+                    if station_id is None:
+                        continue
+                    sid = str(station_id)
+                    if sid not in stations_map:
+                        if stations_key is None:
+                            company = _to_company(
+                                station[company_id_key] if company_id_key in station else _safe_get(station, *company_keys)
+                            )
+                        add_station(
+                            sid,
+                            str(
+                                station[station_name_key]
+                                if station_name_key in station
+                                else _safe_get(station, *_STATION_NAME_KEYS, default=sid)
+                            ),
+                            _to_coord(station[latitude_key] if latitude_key in station else _safe_get(station, *_LATITUDE_KEYS)),
+                            _to_coord(station[longitude_key] if longitude_key in station else _safe_get(station, *_LONGITUDE_KEYS)),
+                            company,
+                        )
+                    for fuel in fuels:
+                        fuel_type_id = fuel[fuel_id_key] if fuel_id_key in fuel else _safe_get(fuel, *_FUEL_ID_KEYS)
+                        if fuel_type_id is None:
+                            continue
+                        fid = str(fuel_type_id)
+                        fname = str(fuel[fuel_name_key] if fuel_name_key in fuel else _safe_get(fuel, *_FUEL_NAME_KEYS, default=fid))
+                        add_price(sid, fid, fname, _to_price(fuel[price_key] if price_key in fuel else _safe_get(fuel, *_PRICE_KEYS)))
+        except (KeyError, TypeError, AttributeError, IndexError) as err:
+            raise SchemaMismatch(str(err)) from err
+        return snapshot
+
+    return _extract
+
+
+class SnapshotParser:
+    """Stateful parser that reuses the schema detected on the first payload.
+
+    Detection only runs again after the compiled extractor reports a
+    mismatch; that refresh falls back to the generic ``build_snapshot``.
+    When a freshly detected schema cannot extract the payload either, the
+    payload mixes shapes: it is remembered and later payloads detecting
+    the same schema go straight to ``build_snapshot``.
+    """
+
+    def __init__(self) -> None:
+        self.schema: PayloadSchema | None = None
+        self._extract: Callable[[Any], FuelSnapshot] | None = None
+        # detected schema whose compiled extractor failed on its own payload
+        self._generic_schema: PayloadSchema | None = None
+
+    def parse(self, data: Any) -> FuelSnapshot | None:
+        if self._extract is not None:
+            try:
+                return self._extract(data)
+            except SchemaMismatch as err:
+                _LOGGER.debug("Payload no longer matches %s (%s), re-detecting", self.schema, err)
+                self.schema = None
+                self._extract = None
+
+        schema = detect_schema(data)
+        if schema is not None and schema != self._generic_schema:
+            extract = compile_extractor(schema)
+            try:
+                snapshot = extract(data)
+            except SchemaMismatch:
+                # mixed shapes within one payload; only the generic path copes
+                _LOGGER.debug("Payload shape is not uniform, using generic extraction")
+                self._generic_schema = schema
+                return build_snapshot(data)
+            self._generic_schema = None
+            self.schema = schema
+            self._extract = extract
+            _LOGGER.debug("Detected payload schema %s", schema)
+            return snapshot
+        return build_snapshot(data)
@@ -0,0 +1,122 @@
+"""Grid index over station coordinates for radius and cheapest-fuel queries."""
+from __future__ import annotations
+
+import heapq
+from math import asin, cos, radians, sin, sqrt
+from typing import TYPE_CHECKING, Any, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from homeassistant.core import HomeAssistant
+
+    from .snapshot import FuelSnapshot, Station
+
+_EARTH_RADIUS_KM = 6371.0
+_KM_PER_DEG_LAT = 111.32
+
+
+def distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres."""
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2) ** 2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2) ** 2
+    return 2 * _EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+class StationGrid:
+    """Uniform latitude/longitude grid of stations.
+
+    Cells are ``cell_deg`` degrees on each side (0.1° is roughly 11 km by
+    6 km in Estonia). A radius query only looks at the cells overlapping
+    the query's bounding box. Stations without coordinates are not indexed.
+    """
+
+    __slots__ = ("cell_deg", "_cells", "size")
+
+    def __init__(self, cell_deg: float = 0.1) -> None:
+        self.cell_deg = cell_deg
+        self._cells: dict[tuple[int, int], list[Station]] = {}
+        self.size = 0
+
+    @classmethod
+    def build(cls, stations: Iterable[Station], cell_deg: float = 0.1) -> StationGrid:
+        grid = cls(cell_deg)
+        cells = grid._cells
+        for station in stations:
+            if station.latitude is None or station.longitude is None:
+                continue
+            cell = (int(station.latitude // cell_deg), int(station.longitude // cell_deg))
+            cells.setdefault(cell, []).append(station)
+            grid.size += 1
+        return grid
+
+    def within(self, latitude: float, longitude: float, radius_km: float) -> Iterator[tuple[Station, float]]:
+        """Yield (station, distance_km) for stations within ``radius_km``."""
+        cell_deg = self.cell_deg
+        dlat = radius_km / _KM_PER_DEG_LAT
+        dlon = radius_km / (_KM_PER_DEG_LAT * max(cos(radians(latitude)), 0.01))
+        lat_lo, lat_hi = int((latitude - dlat) // cell_deg), int((latitude + dlat) // cell_deg)
+        lon_lo, lon_hi = int((longitude - dlon) // cell_deg), int((longitude + dlon) // cell_deg)
+        cells = self._cells
+        for lat_cell in range(lat_lo, lat_hi + 1):
+            for lon_cell in range(lon_lo, lon_hi + 1):
+                for station in cells.get((lat_cell, lon_cell), ()):
+                    dist = distance_km(latitude, longitude, station.latitude, station.longitude)
+                    if dist <= radius_km:
+                        yield station, dist
+
+    def __len__(self) -> int:
+        return self.size
+
+
+def zone_location(hass: HomeAssistant, zone: str | None) -> tuple[float, float] | None:
+    """Return (latitude, longitude) of a zone entity, or of home when unset."""
+    if not zone:
+        return hass.config.latitude, hass.config.longitude
+    state = hass.states.get(zone)
+    if state is None:
+        return None
+    latitude = state.attributes.get("latitude")
+    longitude = state.attributes.get("longitude")
+    if latitude is None or longitude is None:
+        return None
+    return float(latitude), float(longitude)
+
+
+def resolve_fuel_type(snapshot: FuelSnapshot, fuel_type: str) -> str | None:
+    """Return the fuel type id matching an id or a (case-insensitive) name."""
+    fuel_type = str(fuel_type).strip()
+    if fuel_type in snapshot.fuel_types:
+        return fuel_type
+    wanted = fuel_type.casefold()
+    for fid, name in snapshot.fuel_types.items():
+        if name.casefold() == wanted:
+            return fid
+    return None
+
+
+def cheapest_within(
+    snapshot: FuelSnapshot,
+    grid: StationGrid,
+    fuel_type_id: str,
+    latitude: float,
+    longitude: float,
+    radius_km: float,
+    count: int,
+) -> list[dict[str, Any]]:
+    """Return the ``count`` cheapest stations selling a fuel within a radius."""
+    candidates = []
+    for station, dist in grid.within(latitude, longitude, radius_km):
+        price = snapshot.get((station.id, fuel_type_id))
+        if price is not None:
+            candidates.append((price, dist, station))
+    return [
+        {
+            "station_id": station.id,
+            "name": station.name,
+            "price": price,
+            "distance_km": round(dist, 2),
+            "latitude": station.latitude,
+            "longitude": station.longitude,
+        }
+        for price, dist, station in heapq.nsmallest(count, candidates, key=lambda c: (c[0], c[1]))
+    ]
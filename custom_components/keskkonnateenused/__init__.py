@@ -1,75 +1,184 @@
 from __future__ import annotations
 
+import asyncio
 from datetime import timedelta
 import logging
+import time
+from typing import Any
+
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
-
-from .const import DOMAIN, BASE_API, PLATFORMS, UPDATE_INTERVAL
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DOMAIN,
+    LEGACY_UPDATE_INTERVAL,
+    MAX_CONCURRENT_FETCHES,
+    MIN_UPDATE_INTERVAL,
+    PICKUP_REFRESH_LEAD,
+    PLATFORMS,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+    UPDATE_INTERVAL,
+)
+from .fetcher import ContractFetcher
+from .schedule import ContractSchedules, PickupSchedule, refresh_delay
 
 _LOGGER = logging.getLogger(__name__)
 
+# forced refreshes requested within this many seconds are merged into one
+FORCE_REFRESH_DELAY = 1.0
+
+FORCE_REFRESH_SCHEMA = vol.Schema(
+    {
+        vol.Optional("entry_id"): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+
+def _entity_states(hass: HomeAssistant, entry_id: str) -> dict[str, Any]:
+    registry = er.async_get(hass)
+    states = {}
+    for reg_entry in er.async_entries_for_config_entry(registry, entry_id):
+        state = hass.states.get(reg_entry.entity_id)
+        states[reg_entry.unique_id] = (state.state, state.attributes) if state is not None else None
+    return states
+
+
+async def _async_forced_refresh(hass: HomeAssistant, entry_id: str, entry_data: dict) -> dict[str, Any]:
+    await asyncio.sleep(FORCE_REFRESH_DELAY)
+    coordinator = entry_data["coordinator"]
+    reconciler = entry_data.get("entities")
+    if reconciler is not None:
+        reconciler.added.clear()
+    before = _entity_states(hass, entry_id)
+    start = time.monotonic()
+    await coordinator.async_refresh()
+    latency = time.monotonic() - start
+    after = _entity_states(hass, entry_id)
+    # removed sensors are only in before; added ones may not be registered yet
+    changed = {unique_id for unique_id in before.keys() | after.keys() if before.get(unique_id) != after.get(unique_id)}
+    if reconciler is not None:
+        changed |= reconciler.added
+    return {
+        "success": coordinator.last_update_success,
+        "latency_ms": round(latency * 1000, 1),
+        "payload_bytes": entry_data["fetch"].get("payload_bytes"),
+        "changed_entities": len(changed),
+    }
+
+
+async def async_force_refresh(hass: HomeAssistant, entry_id: str) -> dict[str, Any]:
+    """Refresh an entry now and report how it went.
+
+    Calls arriving while a forced refresh of the entry is pending or
+    running share it and get the same report.
+    """
+    entry_data = hass.data[DOMAIN][entry_id]
+    task = entry_data.get("force_refresh")
+    if task is None or task.done():
+        task = entry_data["force_refresh"] = hass.async_create_task(_async_forced_refresh(hass, entry_id, entry_data))
+    return await asyncio.shield(task)
+
 
 async def async_setup(hass: HomeAssistant, config: dict):
     hass.data.setdefault(DOMAIN, {})
 
-    # Register a lightweight admin service to force a coordinator refresh
-    async def _handle_force_refresh(call):
-        entries = list(hass.data.get(DOMAIN, {}).values())
-        for entry in entries:
-            coordinator = entry.get("coordinator")
-            if coordinator is not None:
-                hass.async_create_task(coordinator.async_refresh())
+    # Admin service to refresh now; reports per-entry fetch results
+    async def _handle_force_refresh(call: ServiceCall) -> ServiceResponse:
+        loaded = hass.data.get(DOMAIN, {})
+        entry_ids = call.data.get("entry_id") or list(loaded)
+        unknown = [entry_id for entry_id in entry_ids if entry_id not in loaded]
+        if unknown:
+            raise HomeAssistantError(f"No loaded {DOMAIN} entries: {', '.join(unknown)}")
+        reports = await asyncio.gather(*(async_force_refresh(hass, entry_id) for entry_id in entry_ids))
+        return {"entries": dict(zip(entry_ids, reports))}
+
+    hass.services.async_register(
+        DOMAIN,
+        "force_refresh",
+        _handle_force_refresh,
+        schema=FORCE_REFRESH_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    return True
 
-    hass.services.async_register(DOMAIN, "force_refresh", _handle_force_refresh)
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Move version 1 entries off the old hourly default interval."""
+    if entry.version == 1:
+        options = dict(entry.options)
+        if options.get("update_interval", LEGACY_UPDATE_INTERVAL) == LEGACY_UPDATE_INTERVAL:
+            options["update_interval"] = UPDATE_INTERVAL
+        hass.config_entries.async_update_entry(entry, options=options, version=2)
+        _LOGGER.debug("Migrated %s to version 2, update_interval %s", entry.entry_id, options["update_interval"])
     return True
 
 
+def entry_contracts(entry: ConfigEntry) -> list[str]:
+    """Return the entry's own contract followed by the extra ones from its options."""
+    contracts = [entry.data.get("contract_number"), *(entry.options.get("contract_numbers") or [])]
+    return list(dict.fromkeys(str(contract).strip() for contract in contracts if contract and str(contract).strip()))
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
+    setup_start = time.perf_counter()
 
-    contract = entry.data.get("contract_number")
-    if not contract:
+    contracts = entry_contracts(entry)
+    if not contracts:
         _LOGGER.error("No contract_number in config entry %s", entry.entry_id)
         return False
 
-    api_url = f"{BASE_API}{contract}"
     update_interval = entry.options.get("update_interval", UPDATE_INTERVAL)
+    fetch_stats: dict[str, Any] = {}
+    fetcher = ContractFetcher(hass, contracts, MAX_CONCURRENT_FETCHES)
+    # the confirmed address of the entry's own contract wins over the API's
+    known_addresses = {contracts[0]: str(entry.data["address"])} if entry.data.get("address") else {}
+    schedules: dict[str, PickupSchedule] = {}
+    # last good payloads, so entities come up before the API answers after a restart
+    store: Store[dict] = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}")
+
+    def _snapshot(updated: list[str], tz) -> ContractSchedules | None:
+        # parse only the contracts that got a new payload; the others keep their timelines
+        for contract in updated:
+            schedules[contract] = PickupSchedule.from_payload(fetcher.payloads[contract], tz)
+        if not schedules:
+            return None
+        return ContractSchedules.build({contract: schedules[contract] for contract in contracts if contract in schedules}, known_addresses)
 
     async def async_fetch_data():
-        _LOGGER.debug("Fetching keskkonnateenused data for %s", entry.entry_id)
-        import async_timeout
-        from aiohttp import ClientError
-        from homeassistant.helpers.aiohttp_client import async_get_clientsession
-        import asyncio
-
-        session = async_get_clientsession(hass)
-        attempts = 3
-        backoff = 1
-        for attempt in range(1, attempts + 1):
-            try:
-                async with async_timeout.timeout(10):
-                    resp = await session.get(api_url)
-                    resp.raise_for_status()
-                    data = await resp.json()
-                    _LOGGER.debug("Fetched %s items for %s", (len(data) if hasattr(data, '__len__') else 'unknown'), entry.entry_id)
-                    return data
-            except ClientError as err:
-                _LOGGER.warning("HTTP error fetching data attempt %s: %s", attempt, err)
-            except asyncio.TimeoutError:
-                _LOGGER.warning("Timeout fetching data attempt %s", attempt)
-            except Exception:
-                _LOGGER.exception("Unexpected error fetching data attempt %s", attempt)
-
-            if attempt < attempts:
-                await asyncio.sleep(backoff)
-                backoff *= 2
-
-        _LOGGER.error("All attempts to fetch keskkonnateenused data failed for %s", entry.entry_id)
-        return None
+        _LOGGER.debug("Fetching keskkonnateenused data for %s (%s contracts)", entry.entry_id, len(contracts))
+        updated = await fetcher.async_fetch()
+        fetch_stats["payload_bytes"] = sum(fetcher.payload_bytes.get(contract, 0) for contract in updated) if updated else None
+        if updated:
+            store.async_delay_save(lambda: {"contracts": dict(fetcher.payloads)}, STORAGE_SAVE_DELAY)
+        elif not schedules:
+            _LOGGER.error("All attempts to fetch keskkonnateenused data failed for %s", entry.entry_id)
+            return None
+
+        # parse every pickup date once per refresh, as local calendar dates
+        now = dt_util.now()
+        snapshot = _snapshot(updated, now.tzinfo)
+        delay = refresh_delay(
+            snapshot.next_pickup(now.date()) if snapshot else None, now, MIN_UPDATE_INTERVAL, update_interval, PICKUP_REFRESH_LEAD
+        )
+        retry = fetcher.retry_delay()
+        if retry is not None:
+            # come back for a backed-off contract without waiting a whole interval
+            delay = min(delay, max(retry, 1.0))
+        coordinator.update_interval = timedelta(seconds=delay)
+        _LOGGER.debug("Next schedule refresh for %s in %.0f s", entry.entry_id, delay)
+        return snapshot
 
     coordinator = DataUpdateCoordinator(
         hass,
@@ -79,33 +188,56 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         update_interval=timedelta(seconds=update_interval),
     )
 
-    hass.data[DOMAIN][entry.entry_id] = {"coordinator": coordinator}
-
-    # Schedule a background first refresh so data is fetched without blocking startup.
     try:
-        hass.async_create_task(coordinator.async_config_entry_first_refresh())
+        stored = await store.async_load()
     except Exception:
-        _LOGGER.exception("Failed scheduling initial refresh for %s", entry.entry_id)
+        _LOGGER.exception("Failed loading stored schedule for %s", entry.entry_id)
+        stored = None
+    if stored:
+        fetcher.restore(stored.get("contracts") or {})
+        coordinator.data = _snapshot(list(fetcher.payloads), dt_util.now().tzinfo)
 
-    # Wait briefly for the initial data to appear (so sensors can be created with data),
-    # but don't block startup for too long. Poll coordinator.data up to 30 seconds.
-    try:
-        import asyncio
+    startup: dict[str, Any] = {"restored": coordinator.data is not None}
+    hass.data[DOMAIN][entry.entry_id] = {"coordinator": coordinator, "fetcher": fetcher, "fetch": fetch_stats, "startup": startup}
 
-        wait_secs = 30
-        for _ in range(wait_secs):
-            if coordinator.data:
-                break
-            await asyncio.sleep(1)
-    except Exception:
-        _LOGGER.exception("Waiting for initial data failed for %s", entry.entry_id)
+    async def _async_first_refresh() -> None:
+        await coordinator.async_refresh()
+        startup["first_refresh_seconds"] = round(time.perf_counter() - setup_start, 3)
+        _LOGGER.debug("First refresh of %s finished %.3f s after setup started", entry.entry_id, startup["first_refresh_seconds"])
+
+    # Refresh in the background: HA startup does not wait for background tasks,
+    # and the sensor platform creates entities once data is there.
+    entry.async_create_background_task(hass, _async_first_refresh(), f"{DOMAIN}_{entry.entry_id}_first_refresh")
+
+    # "days until" only moves at local midnight: recompute from the cached
+    # timelines then instead of downloading the schedule again
+    @callback
+    def _midnight_rollover(_now) -> None:
+        if coordinator.data:
+            coordinator.async_update_listeners()
+
+    entry.async_on_unload(async_track_time_change(hass, _midnight_rollover, hour=0, minute=0, second=0))
+
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    startup["setup_seconds"] = round(time.perf_counter() - setup_start, 3)
+    _LOGGER.debug("Set up %s in %.3f s (restored=%s)", entry.entry_id, startup["setup_seconds"], startup["restored"])
     return True
 
 
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload so new contracts or a new interval take effect."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id, None)
     return unload_ok
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored schedule when the entry is deleted."""
+    await Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry.entry_id}").async_remove()
@@ -3,19 +3,28 @@ from __future__ import annotations
 import voluptuous as vol
 import logging
 from homeassistant import config_entries
+from homeassistant.helpers.selector import SelectSelector, SelectSelectorConfig, SelectSelectorMode
 
 from .const import DOMAIN, UPDATE_INTERVAL, BASE_API
 
 _LOGGER = logging.getLogger(__name__)
 
 
+def _contracts_select() -> SelectSelector:
+    """Free-form list of extra contract numbers polled by the same entry."""
+    return SelectSelector(SelectSelectorConfig(options=[], multiple=True, custom_value=True, mode=SelectSelectorMode.DROPDOWN))
+
+
 class KeskkonnateenusedFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
-    VERSION = 1
+    VERSION = 2
+
+    _extra_contracts: list[str] = []
 
     async def async_step_user(self, user_input=None):
         errors = {}
         if user_input is not None:
             contract = str(user_input["contract_number"])
+            self._extra_contracts = [str(c) for c in user_input.get("contract_numbers", []) if str(c) != contract]
             # attempt to fetch API to extract address for confirmation
             address = None
             # import network helpers lazily to avoid import-time errors
@@ -61,13 +70,14 @@ class KeskkonnateenusedFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 return self.async_show_form(step_id="confirm", data_schema=schema, errors=errors)
 
             data = {"contract_number": contract}
-            options = {"update_interval": user_input.get("update_interval", UPDATE_INTERVAL)}
+            options = {"update_interval": user_input.get("update_interval", UPDATE_INTERVAL), "contract_numbers": self._extra_contracts}
             return self.async_create_entry(title="Keskonnateenused", data=data, options=options)
 
         # show initial user form when no input provided
         schema = vol.Schema(
             {
                 vol.Required("contract_number"): str,
+                vol.Optional("contract_numbers", default=[]): _contracts_select(),
                 vol.Optional("update_interval", default=UPDATE_INTERVAL): int,
             }
         )
@@ -79,7 +89,7 @@ class KeskkonnateenusedFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
         errors = {}
         if user_input is not None:
             data = {"contract_number": str(user_input.get("contract_number")), "address": str(user_input.get("address"))}
-            options = {"update_interval": user_input.get("update_interval", UPDATE_INTERVAL)}
+            options = {"update_interval": user_input.get("update_interval", UPDATE_INTERVAL), "contract_numbers": self._extra_contracts}
             return self.async_create_entry(title="Keskonnateenused", data=data, options=options)
 
         # Shouldn't reach here; show empty form defensively
@@ -115,6 +125,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
             {
                 vol.Required("update_interval", default=self._config_entry.options.get("update_interval", UPDATE_INTERVAL)): int,
                 vol.Optional("address", default=self._config_entry.data.get("address")): str,
+                vol.Optional("contract_numbers", default=self._config_entry.options.get("contract_numbers", [])): _contracts_select(),
             }
         )
 
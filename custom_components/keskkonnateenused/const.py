@@ -2,4 +2,19 @@ DOMAIN = "keskkonnateenused"
 DEFAULT_NAME = "Keskkonnateenused"
 BASE_API = "https://cms.keskkonnateenused.ee/wp-json/general-purpose-api/upcoming-discharges?contractNumber="
 PLATFORMS = ["sensor"]
-UPDATE_INTERVAL = 3600
+# longest time between schedule downloads; see schedule.refresh_delay
+UPDATE_INTERVAL = 86400
+# what every entry got by default before refreshes followed the schedule
+LEGACY_UPDATE_INTERVAL = 3600
+MIN_UPDATE_INTERVAL = 3600
+# refresh this long before the day of the next pickup
+PICKUP_REFRESH_LEAD = 6 * 3600
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10
+# contracts of one entry downloaded at the same time
+MAX_CONCURRENT_FETCHES = 4
+# a contract that failed every attempt is skipped this long, doubling per failure
+CONTRACT_RETRY_BACKOFF = 900
+CONTRACT_RETRY_BACKOFF_MAX = UPDATE_INTERVAL
+# fresh payloads of its contract a garbage type must be missing from before its sensor is retired
+SENSOR_REMOVAL_REFRESHES = 3
@@ -0,0 +1,104 @@
+"""Download the upcoming-discharges payload of every contract of an entry."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from .const import BASE_API, CONTRACT_RETRY_BACKOFF, CONTRACT_RETRY_BACKOFF_MAX
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ContractFetcher:
+    """Fetch the schedules of several contracts concurrently.
+
+    All contracts share Home Assistant's aiohttp session and at most
+    ``limit`` download at once. A contract that fails every attempt keeps
+    its last good payload and is skipped until its backoff runs out, so
+    one bad contract neither holds back nor slows down the others.
+    """
+
+    def __init__(self, hass: HomeAssistant, contracts: list[str], limit: int, attempts: int = 3) -> None:
+        self.hass = hass
+        self.contracts = tuple(dict.fromkeys(contracts))
+        self.attempts = attempts
+        self._semaphore = asyncio.Semaphore(max(1, limit))
+        # last good payload and its size per contract
+        self.payloads: dict[str, Any] = {}
+        self.payload_bytes: dict[str, int] = {}
+        self._failures: dict[str, int] = {}
+        self._retry_at: dict[str, float] = {}
+
+    def restore(self, payloads: dict[str, Any]) -> None:
+        """Seed last good payloads, e.g. from storage."""
+        for contract in self.contracts:
+            if payloads.get(contract):
+                self.payloads[contract] = payloads[contract]
+
+    def retry_delay(self, now: float | None = None) -> float | None:
+        """Return seconds until the first backed-off contract may be asked again."""
+        if not self._retry_at:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self._retry_at.values()) - now)
+
+    async def _async_fetch_one(self, session, contract: str) -> tuple[Any, int]:
+        import async_timeout
+        from aiohttp import ClientError
+        from homeassistant.util.json import json_loads
+
+        url = f"{BASE_API}{contract}"
+        backoff = 1
+        for attempt in range(1, self.attempts + 1):
+            try:
+                async with self._semaphore:
+                    async with async_timeout.timeout(10):
+                        resp = await session.get(url)
+                        resp.raise_for_status()
+                        body = await resp.read()
+                        return json_loads(body), len(body)
+            except ClientError as err:
+                _LOGGER.warning("HTTP error fetching contract %s attempt %s: %s", contract, attempt, err)
+            except asyncio.TimeoutError:
+                _LOGGER.warning("Timeout fetching contract %s attempt %s", contract, attempt)
+            except Exception:
+                _LOGGER.exception("Unexpected error fetching contract %s attempt %s", contract, attempt)
+
+            if attempt < self.attempts:
+                # sleep without holding a slot, so other contracts keep going
+                await asyncio.sleep(backoff)
+                backoff *= 2
+        raise RuntimeError(f"all {self.attempts} attempts failed")
+
+    async def async_fetch(self) -> list[str]:
+        """Refresh every contract that is not backing off; return the ones that got a new payload."""
+        from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+        session = async_get_clientsession(self.hass)
+        now = time.monotonic()
+        due = [contract for contract in self.contracts if self._retry_at.get(contract, now) <= now]
+        if len(due) < len(self.contracts):
+            _LOGGER.debug("Skipping %s backed-off contracts", len(self.contracts) - len(due))
+
+        results = await asyncio.gather(*(self._async_fetch_one(session, contract) for contract in due), return_exceptions=True)
+        updated = []
+        now = time.monotonic()
+        for contract, result in zip(due, results):
+            if isinstance(result, BaseException):
+                failures = self._failures[contract] = self._failures.get(contract, 0) + 1
+                backoff = min(CONTRACT_RETRY_BACKOFF * 2 ** (failures - 1), CONTRACT_RETRY_BACKOFF_MAX)
+                self._retry_at[contract] = now + backoff
+                _LOGGER.error("Fetching contract %s failed (%s in a row), retrying in %.0f s: %s", contract, failures, backoff, result)
+                continue
+            self._failures.pop(contract, None)
+            self._retry_at.pop(contract, None)
+            data, size = result
+            self.payload_bytes[contract] = size
+            # an empty reply is news too: the contract has nothing scheduled
+            self.payloads[contract] = data
+            updated.append(contract)
+        return updated
@@ -0,0 +1,205 @@
+"""Parse the upcoming-discharges payload into per-garbage-type pickup timelines."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from typing import Any
+
+ITEMS_KEYS = ("data", "items", "upcomingDischarges", "discharges")
+DATE_KEYS = ("date", "pickupDate", "plannedDate", "dischargeDate", "serviceDate", "next_date", "start")
+GARBAGE_KEYS = ("garbage", "waste", "type", "name")
+ADDRESS_KEYS = ("address", "addressText", "street", "streetAddress", "location", "addr", "address_line")
+
+
+def extract_items(data: Any) -> list[dict]:
+    """Return the list of pickup records in a payload (a list or a dict wrapping one)."""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for key in ITEMS_KEYS:
+            value = data.get(key)
+            if isinstance(value, list):
+                return value
+    return []
+
+
+def garbage_type(item: dict) -> str:
+    for key in GARBAGE_KEYS:
+        value = item.get(key)
+        if isinstance(value, str):
+            return value
+    return str(item.get("garbage", "unknown")).strip()
+
+
+def record_address(records: list[dict]) -> str | None:
+    """Return the first address found in ``records``."""
+    for item in records:
+        for key in ADDRESS_KEYS:
+            if item.get(key):
+                return str(item[key]).strip()
+    return None
+
+
+def pickup_value(item: dict) -> Any:
+    for key in DATE_KEYS:
+        value = item.get(key)
+        if value:
+            return value
+    return None
+
+
+def parse_pickup_date(value: Any, tz: tzinfo = timezone.utc) -> date | None:
+    """Return the calendar date of a pickup value in ``tz``.
+
+    Accepts ISO dates and datetimes (naive ones are taken as UTC) and unix
+    timestamps; anything else gives None.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            parsed = datetime.fromtimestamp(float(value), tz=timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            return None
+    else:
+        text = str(value).strip()
+        if len(text) == 10:
+            try:
+                return date.fromisoformat(text)
+            except ValueError:
+                return None
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(tz).date()
+
+
+class PickupTimeline:
+    """Sorted, de-duplicated pickup dates of one garbage type.
+
+    Dates are kept as ordinals so a lookup is one bisect. Dates before the
+    day asked about are dropped on lookup, so the list only ever holds
+    upcoming pickups.
+    """
+
+    __slots__ = ("_days",)
+
+    def __init__(self, days: list[date] | None = None) -> None:
+        self._days = sorted({day.toordinal() for day in days or ()})
+
+    def _evict(self, today: date) -> int:
+        ordinal = today.toordinal()
+        index = bisect_left(self._days, ordinal)
+        if index:
+            del self._days[:index]
+        return ordinal
+
+    def next_pickup(self, today: date) -> date | None:
+        """Return the first pickup on or after ``today``."""
+        self._evict(today)
+        return date.fromordinal(self._days[0]) if self._days else None
+
+    def days_until(self, today: date) -> int | None:
+        ordinal = self._evict(today)
+        return self._days[0] - ordinal if self._days else None
+
+    def upcoming(self) -> list[date]:
+        return [date.fromordinal(ordinal) for ordinal in self._days]
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, PickupTimeline):
+            return NotImplemented
+        return self._days == other._days
+
+    __hash__ = None  # type: ignore[assignment]
+
+
+@dataclass(slots=True)
+class PickupSchedule:
+    """One refresh worth of pickups: raw records and a timeline per garbage type."""
+
+    records: dict[str, list[dict]] = field(default_factory=dict)
+    timelines: dict[str, PickupTimeline] = field(default_factory=dict)
+
+    @classmethod
+    def from_payload(cls, data: Any, tz: tzinfo = timezone.utc) -> PickupSchedule:
+        """Group the payload by garbage type and parse every date once."""
+        records: dict[str, list[dict]] = {}
+        days: dict[str, list[date]] = {}
+        for item in extract_items(data):
+            if not isinstance(item, dict):
+                continue
+            gtype = garbage_type(item)
+            records.setdefault(gtype, []).append(item)
+            day = parse_pickup_date(pickup_value(item), tz)
+            bucket = days.setdefault(gtype, [])
+            if day is not None:
+                bucket.append(day)
+        return cls(records, {gtype: PickupTimeline(dates) for gtype, dates in days.items()})
+
+    def next_pickup(self, today: date) -> date | None:
+        """Return the first pickup of any garbage type on or after ``today``."""
+        upcoming = [day for timeline in self.timelines.values() if (day := timeline.next_pickup(today)) is not None]
+        return min(upcoming) if upcoming else None
+
+    def __bool__(self) -> bool:
+        return bool(self.records)
+
+
+@dataclass(slots=True)
+class ContractSchedules:
+    """The schedules of every contract of one entry, by contract and by address.
+
+    ``contracts`` maps a contract number to its schedule and ``addresses``
+    to its address; ``by_address`` lists the contracts at each address.
+    """
+
+    contracts: dict[str, PickupSchedule] = field(default_factory=dict)
+    addresses: dict[str, str] = field(default_factory=dict)
+    by_address: dict[str, list[str]] = field(default_factory=dict)
+
+    @classmethod
+    def build(cls, schedules: dict[str, PickupSchedule], known: dict[str, str] | None = None) -> ContractSchedules:
+        """Index ``schedules``; an address in ``known`` wins over one found in the records."""
+        known = known or {}
+        addresses: dict[str, str] = {}
+        by_address: dict[str, list[str]] = {}
+        for contract, schedule in schedules.items():
+            address = known.get(contract)
+            if not address:
+                address = next((found for records in schedule.records.values() if (found := record_address(records))), None)
+            address = addresses[contract] = address or contract
+            by_address.setdefault(address, []).append(contract)
+        return cls(dict(schedules), addresses, by_address)
+
+    def next_pickup(self, today: date) -> date | None:
+        """Return the first pickup of any contract on or after ``today``."""
+        upcoming = [day for schedule in self.contracts.values() if (day := schedule.next_pickup(today)) is not None]
+        return min(upcoming) if upcoming else None
+
+    def __bool__(self) -> bool:
+        return any(self.contracts.values())
+
+
+def refresh_delay(next_pickup: date | None, now: datetime, minimum: float, maximum: float, lead: float) -> float:
+    """Return seconds until the next network refresh.
+
+    The schedule rarely changes, so refreshes are ``maximum`` apart except
+    for one ``lead`` seconds before the day of the next pickup, to catch a
+    moved date. Never less than ``minimum``.
+    """
+    if next_pickup is None:
+        return maximum
+    target = datetime.combine(next_pickup, time.min, tzinfo=now.tzinfo) - timedelta(seconds=lead)
+    delay = (target - now).total_seconds()
+    if delay <= 0:
+        # already inside the lead window; the pre-pickup refresh has happened
+        return maximum
+    return min(max(delay, minimum), maximum)
@@ -1,27 +1,28 @@
 from __future__ import annotations
 
 import logging
-from datetime import datetime, timezone
+from datetime import date
+import re
 from typing import Any
 
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.util.dt import parse_datetime, utcnow
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .const import DOMAIN, SENSOR_REMOVAL_REFRESHES
+from .schedule import PickupSchedule, PickupTimeline
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def _safe_get(d: dict | list | None, *keys, default=None):
-    if d is None:
-        return default
-    if isinstance(d, list):
-        return d
-    for k in keys:
-        if isinstance(d, dict) and k in d:
-            return d[k]
-    return default
+def _slugify(s: str) -> str:
+    """Return a safe identifier from an address."""
+    if s is None:
+        return "unknown"
+    s2 = re.sub(r"[^0-9a-zA-Z]+", "_", s).strip("_")
+    return s2[:64] if s2 else "unknown"
 
 
 async def async_setup_entry(hass, entry, async_add_entities):
@@ -32,122 +33,130 @@ async def async_setup_entry(hass, entry, async_add_entities):
         return
 
     coordinator = entry_data["coordinator"]
-    created = False
-
-    def _extract_list(d):
-        if isinstance(d, list):
-            return d
-        if isinstance(d, dict):
-            for k in ("data", "items", "upcomingDischarges", "discharges"): 
-                v = d.get(k)
-                if isinstance(v, list):
-                    return v
-        return None
-
-    async def _create_entities():
-        nonlocal created
-        if created:
+    reconciler = GarbageEntityReconciler(hass, entry, coordinator, async_add_entities)
+    entry_data["entities"] = reconciler
+
+    # registered before any sensor, so it runs first on every update
+    entry.async_on_unload(coordinator.async_add_listener(reconciler.async_reconcile))
+    reconciler.async_reconcile()
+
+
+class GarbageEntityReconciler:
+    """Keep one sensor per garbage type in the current schedule.
+
+    Runs on every coordinator update. In a single pass over the garbage
+    types of every contract it hands live sensors their new timeline,
+    creates sensors for new types and retires sensors whose type left the
+    schedule. Sensors are grouped into one device per address.
+
+    Retiring deletes the registry entry and the user's customisations with
+    it, so a type has to be missing from ``SENSOR_REMOVAL_REFRESHES``
+    freshly downloaded payloads of its contract first; until then its
+    sensor has no timeline. A contract that kept its old payload because
+    the download failed does not count.
+    """
+
+    def __init__(self, hass, entry, coordinator, async_add_entities) -> None:
+        self.hass = hass
+        self.entry = entry
+        self.coordinator = coordinator
+        self._async_add_entities = async_add_entities
+        self.entities: dict[str, GarbagePickupSensor] = {}
+        # schedule each contract had at the last reconcile, to tell fresh payloads apart
+        self._schedules: dict[str, PickupSchedule] = {}
+        # unique id -> fresh payloads its garbage type has been missing from
+        self._missing: dict[str, int] = {}
+        # unique ids of sensors created since a forced refresh last cleared it
+        self.added: set[str] = set()
+
+    @callback
+    def async_reconcile(self) -> None:
+        snapshot = self.coordinator.data
+        if snapshot is None:
+            _LOGGER.debug("No data available in coordinator for entry %s", self.entry.entry_id)
             return
-        data = coordinator.data
-        if not data:
-            _LOGGER.debug("No data available in coordinator for entry %s", entry.entry_id)
-            return
-
-        items = _extract_list(data) or []
-        if not items and isinstance(data, list):
-            items = data
-
-        garbage_map: dict[str, list[dict]] = {}
-
-        # find garbage type and date fields heuristically
-        date_keys = ("date", "pickupDate", "plannedDate", "dischargeDate", "serviceDate", "next_date", "start")
-        garbage_keys = ("garbage", "waste", "type", "name")
-
-        for it in items:
-            if not isinstance(it, dict):
-                continue
-            g = None
-            for k in garbage_keys:
-                if k in it and isinstance(it[k], str):
-                    g = it[k]
-                    break
-            if g is None:
-                # try nested/alternative
-                g = str(it.get("garbage", "unknown")).strip()
-
-            # find date value
-            dval = None
-            for dk in date_keys:
-                if dk in it and it[dk]:
-                    dval = it[dk]
-                    break
-
-            entry_record = {"raw": it, "date": dval}
-            garbage_map.setdefault(g, []).append(entry_record)
 
+        live = self.entities
+        seen: set[str] = set()
         entities: list[GarbagePickupSensor] = []
-
-        # helper to create safe identifier from address
-        def _slugify(s: str) -> str:
-            import re
-            if s is None:
-                return "unknown"
-            s2 = re.sub(r"[^0-9a-zA-Z]+", "_", s).strip("_")
-            return s2[:64] if s2 else "unknown"
-
-        address_keys = ("address", "addressText", "street", "streetAddress", "location", "addr", "address_line")
-
-        # prefer stored address from config entry data if available
-        stored_address = entry.data.get("address") if hasattr(entry, "data") else None
-        for gtype, records in garbage_map.items():
-            if stored_address:
-                address_str = str(stored_address)
-            else:
-                # try to extract an address from one of the records
-                address_str = None
-                for rec in records:
-                    raw = rec.get("raw") or {}
-                    for ak in address_keys:
-                        if ak in raw and raw[ak]:
-                            address_str = str(raw[ak]).strip()
-                            break
-                    if address_str:
-                        break
-                if not address_str:
-                    address_str = str(entry.data.get("contract_number", f"keskkonnateenused_{entry.entry_id}"))
-
+        for contract, schedule in snapshot.contracts.items():
+            address_str = snapshot.addresses[contract]
             slug = _slugify(address_str)
-            unique_id = f"{entry.entry_id}_{slug}_{gtype}"
-            name = f"{gtype} pickup"
-            device_info = {
-                "identifiers": {(DOMAIN, f"address_{slug}")},
-                "name": address_str,
-                "manufacturer": "Keskkonnateenused",
-            }
-
-            entities.append(GarbagePickupSensor(coordinator, unique_id, name, gtype, records, device_info))
+            for gtype in schedule.records:
+                timeline = schedule.timelines.get(gtype)
+                unique_id = f"{self.entry.entry_id}_{slug}_{gtype}"
+                if unique_id in seen:
+                    # two contracts at one address: keep both sensors apart
+                    unique_id = f"{unique_id}_{contract}"
+                seen.add(unique_id)
+                self._missing.pop(unique_id, None)
+                sensor = live.get(unique_id)
+                if sensor is not None:
+                    sensor.timeline = timeline
+                    continue
+                device_info = {
+                    "identifiers": {(DOMAIN, f"address_{slug}")},
+                    "name": address_str,
+                    "manufacturer": "Keskkonnateenused",
+                }
+                sensor = live[unique_id] = GarbagePickupSensor(
+                    self.coordinator, unique_id, f"{gtype} pickup", timeline, device_info, contract
+                )
+                entities.append(sensor)
+                self.added.add(unique_id)
+
+        fresh = {contract for contract, schedule in snapshot.contracts.items() if schedule is not self._schedules.get(contract)}
+        self._schedules = dict(snapshot.contracts)
+        retired = []
+        missing = self._missing
+        for unique_id in live.keys() - seen:
+            sensor = live[unique_id]
+            sensor.timeline = None
+            if sensor.contract in fresh:
+                missing[unique_id] = missing.get(unique_id, 0) + 1
+            if missing.get(unique_id, 0) >= SENSOR_REMOVAL_REFRESHES:
+                del missing[unique_id]
+                retired.append(unique_id)
+        if retired:
+            registry = er.async_get(self.hass)
+            for unique_id in retired:
+                sensor = live.pop(unique_id)
+                if sensor.registry_entry is not None:
+                    # removing the registry entry also removes the live entity
+                    registry.async_remove(sensor.entity_id)
+                elif sensor.hass is not None:
+                    self.hass.async_create_task(sensor.async_remove())
+            _LOGGER.debug("Retired %s garbage type sensors for %s", len(retired), self.entry.entry_id)
 
         if entities:
-            async_add_entities(entities, True)
-            created = True
-
-    coordinator.async_add_listener(lambda: hass.async_create_task(_create_entities()))
-    await _create_entities()
+            _LOGGER.debug("Adding %s garbage type sensors for %s", len(entities), self.entry.entry_id)
+            self._async_add_entities(entities)
 
 
 class GarbagePickupSensor(CoordinatorEntity, SensorEntity):
     entity_registry_enabled_default = True
 
-    def __init__(self, coordinator, unique_id: str, name: str, garbage_type: str, records: list[dict], device_info: dict | None = None):
+    def __init__(
+        self,
+        coordinator,
+        unique_id: str,
+        name: str,
+        timeline: PickupTimeline | None,
+        device_info: dict | None = None,
+        contract: str | None = None,
+    ):
         super().__init__(coordinator)
         self._attr_name = name
         self._attr_unique_id = unique_id
         self._attr_icon = "mdi:trash-can"
         self._attr_native_unit_of_measurement = "days"
-        self._garbage_type = garbage_type
-        self._records = records
+        # replaced in place by GarbageEntityReconciler on every refresh
+        self.timeline = timeline
         self._state: Any = None
+        self._next_pickup: date | None = None
         self._device_info = device_info
+        self.contract = contract
+        self._update_state_from_data()
 
     @property
     def native_value(self):
@@ -157,66 +166,22 @@ class GarbagePickupSensor(CoordinatorEntity, SensorEntity):
     def available(self) -> bool:
         return self._state is not None
 
-    def _parse_date(self, val) -> datetime | None:
-        if val is None:
-            return None
-        try:
-            dt = parse_datetime(val)
-            if dt is None and isinstance(val, (int, float)):
-                # maybe unix timestamp
-                return datetime.fromtimestamp(float(val), tz=timezone.utc)
-            if dt is not None and dt.tzinfo is None:
-                # assume UTC
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt
-        except Exception:
-            try:
-                # fallback: try ISO parsing
-                return datetime.fromisoformat(str(val))
-            except Exception:
-                return None
-
-    def _compute_days_to(self, target: datetime) -> int:
-        if target is None:
-            return -1
-        now = utcnow()
-        try:
-            # compare dates to yield full days
-            delta = target.date() - now.date()
-            return delta.days
-        except Exception:
-            return -1
+    @property
+    def extra_state_attributes(self):
+        return {
+            "next_pickup": self._next_pickup.isoformat() if self._next_pickup else None,
+            "contract_number": self.contract,
+        }
 
     def _update_state_from_data(self) -> None:
-        data = self.coordinator.data
-        items = data if isinstance(data, list) else (data.get("data") if isinstance(data, dict) else None)
-
-        # use our cached records if items not available
-        records = self._records
-
-        soonest: datetime | None = None
-        for rec in records:
-            dval = rec.get("date")
-            if dval is None:
-                # try locate in raw dict
-                raw = rec.get("raw", {})
-                for k in ("date", "pickupDate", "plannedDate", "dischargeDate", "serviceDate", "next_date", "start"):
-                    if k in raw:
-                        dval = raw[k]
-                        break
-            dt = self._parse_date(dval)
-            if dt is None:
-                continue
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            if soonest is None or dt < soonest:
-                soonest = dt
-
-        if soonest is None:
-            self._state = None
-        else:
-            days = self._compute_days_to(soonest)
-            self._state = int(days)
+        timeline = self.timeline
+        if timeline is None:
+            self._state = self._next_pickup = None
+            return
+        # local calendar day; the timeline drops past dates itself and this is one bisect
+        today = dt_util.now().date()
+        self._next_pickup = timeline.next_pickup(today)
+        self._state = (self._next_pickup - today).days if self._next_pickup else None
 
     def _handle_coordinator_update(self) -> None:
         try:
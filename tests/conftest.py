@@ -0,0 +1,16 @@
+"""Fixtures shared by the integration tests."""
+from __future__ import annotations
+
+from pathlib import Path
+import sys
+
+import pytest
+
+# the synthetic feed generator is shared with the benchmarks
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks" / "fuel_estonia"))
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Load the integrations from custom_components."""
+    yield
@@ -0,0 +1,25 @@
+"""Tests for the fuel_estonia integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from custom_components.fuel_estonia.const import DEFAULT_API, DOMAIN
+
+
+def serve_feed(aioclient_mock: AiohttpClientMocker, payload: Any) -> None:
+    """Answer the default feed url with ``payload`` from now on; resets the call count."""
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(DEFAULT_API, json=payload)
+
+
+async def setup_entry(hass: HomeAssistant, **options: Any) -> MockConfigEntry:
+    """Add an entry polling the default feed, set it up and wait for the first refresh."""
+    entry = MockConfigEntry(domain=DOMAIN, data={"api_url": DEFAULT_API}, options={"update_interval": 300, **options})
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
@@ -0,0 +1,12 @@
+"""Fixtures for the fuel_estonia tests."""
+from __future__ import annotations
+
+import pytest
+
+from custom_components.fuel_estonia import coordinator
+
+
+@pytest.fixture(autouse=True)
+def no_force_refresh_delay(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Start forced refreshes right away; calls still overlap within one loop turn."""
+    monkeypatch.setattr(coordinator, "FORCE_REFRESH_DELAY", 0)
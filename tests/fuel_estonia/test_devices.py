@@ -0,0 +1,129 @@
+"""Tests for the fuel type device sync."""
+from __future__ import annotations
+
+from feedgen import bump_prices, generate
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from custom_components.fuel_estonia.const import DEVICE_REMOVAL_REFRESHES, DOMAIN
+from custom_components.fuel_estonia.devices import FuelTypeDeviceSync
+from custom_components.fuel_estonia.snapshot import FuelSnapshot
+
+from . import serve_feed, setup_entry
+
+FUEL_TYPES = {"1": "95", "2": "98", "3": "Diesel"}
+
+
+def _snapshot(*fuel_type_ids: str) -> FuelSnapshot:
+    snapshot = FuelSnapshot()
+    snapshot.add_station("1", "Station 1")
+    for fuel_type_id in fuel_type_ids:
+        snapshot.add_price("1", fuel_type_id, FUEL_TYPES[fuel_type_id], 1.5)
+    return snapshot
+
+
+def _device_fuel_types(hass: HomeAssistant, entry: MockConfigEntry) -> set[str]:
+    registry = dr.async_get(hass)
+    return {
+        identifier.removeprefix("fuel_type_")
+        for device in dr.async_entries_for_config_entry(registry, entry.entry_id)
+        for domain, identifier in device.identifiers
+        if domain == DOMAIN
+    }
+
+
+async def test_creates_and_renames_devices(hass: HomeAssistant) -> None:
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    sync = FuelTypeDeviceSync(hass, entry)
+
+    assert sync.async_sync(_snapshot("1", "2", "3")) == set()
+    assert _device_fuel_types(hass, entry) == {"1", "2", "3"}
+
+    renamed = FuelSnapshot()
+    renamed.add_station("1", "Station 1")
+    renamed.add_price("1", "1", "95 Premium", 1.5)
+    renamed.add_price("1", "2", "98", 1.5)
+    renamed.add_price("1", "3", "Diesel", 1.5)
+    sync.async_sync(renamed)
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "fuel_type_1")})
+    assert device.name == "95 Premium"
+
+
+async def test_detaches_after_repeated_absence(hass: HomeAssistant) -> None:
+    """A fuel type keeps its device until it missed several fresh complete snapshots."""
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    sync = FuelTypeDeviceSync(hass, entry)
+    sync.async_sync(_snapshot("1", "2", "3"))
+
+    for _ in range(DEVICE_REMOVAL_REFRESHES - 1):
+        assert sync.async_sync(_snapshot("1", "2")) == set()
+    assert _device_fuel_types(hass, entry) == {"1", "2", "3"}
+
+    assert sync.async_sync(_snapshot("1", "2")) == {"3"}
+    assert _device_fuel_types(hass, entry) == {"1", "2"}
+
+
+async def test_same_or_incomplete_snapshot_does_not_count(hass: HomeAssistant) -> None:
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    sync = FuelTypeDeviceSync(hass, entry)
+    sync.async_sync(_snapshot("1", "2", "3"))
+
+    snapshot = _snapshot("1", "2")
+    for _ in range(DEVICE_REMOVAL_REFRESHES):
+        # an unchanged refresh hands back the same snapshot object
+        assert sync.async_sync(snapshot) == set()
+    for _ in range(DEVICE_REMOVAL_REFRESHES):
+        # a failed or partial refresh
+        assert sync.async_sync(_snapshot("1", "2"), complete=False) == set()
+    assert _device_fuel_types(hass, entry) == {"1", "2", "3"}
+
+
+async def test_reappearing_fuel_type_resets_count(hass: HomeAssistant) -> None:
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+    sync = FuelTypeDeviceSync(hass, entry)
+    sync.async_sync(_snapshot("1", "2", "3"))
+
+    for _ in range(DEVICE_REMOVAL_REFRESHES - 1):
+        sync.async_sync(_snapshot("1", "2"))
+    sync.async_sync(_snapshot("1", "2", "3"))
+    for _ in range(DEVICE_REMOVAL_REFRESHES - 1):
+        assert sync.async_sync(_snapshot("1", "2")) == set()
+    assert _device_fuel_types(hass, entry) == {"1", "2", "3"}
+
+
+def _without_fuel_type(payload: dict, fuel_type_id: int) -> dict:
+    for company in payload["priceInfo"]:
+        for station in company["stationInfos"]:
+            station["fuelInfos"] = [fuel for fuel in station["fuelInfos"] if fuel["fuelTypeId"] != fuel_type_id]
+    return payload
+
+
+async def test_detached_fuel_type_gets_sensors_again(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """Entities go with a detached device; the fuel type coming back recreates them."""
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    registry = er.async_get(hass)
+    unique_id = f"{entry.entry_id}_5_aggregate_min"
+    assert registry.async_get_entity_id("sensor", DOMAIN, unique_id)
+
+    for seed in range(DEVICE_REMOVAL_REFRESHES):
+        payload = _without_fuel_type(generate(6, companies=2), 5)
+        bump_prices(payload, 0.5, seed=seed)
+        serve_feed(aioclient_mock, payload)
+        await coordinator.async_force_refresh()
+        await hass.async_block_till_done()
+    assert "5" not in _device_fuel_types(hass, entry)
+    assert registry.async_get_entity_id("sensor", DOMAIN, unique_id) is None
+
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    await coordinator.async_force_refresh()
+    await hass.async_block_till_done()
+    assert "5" in _device_fuel_types(hass, entry)
+    assert registry.async_get_entity_id("sensor", DOMAIN, unique_id)
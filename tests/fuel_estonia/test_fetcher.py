@@ -0,0 +1,50 @@
+"""Tests for the fetcher shared between entries."""
+from __future__ import annotations
+
+from feedgen import generate
+from homeassistant.core import HomeAssistant
+import pytest
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from custom_components.fuel_estonia.const import DOMAIN
+from custom_components.fuel_estonia.fetcher import SHARED_FETCHERS
+
+from . import serve_feed, setup_entry
+
+
+async def test_entries_share_one_download(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    first = await setup_entry(hass)
+    second = await setup_entry(hass, companies=["1"])
+
+    assert aioclient_mock.call_count == 1
+    coordinators = [hass.data[DOMAIN][entry.entry_id]["coordinator"] for entry in (first, second)]
+    assert coordinators[0].fetcher is coordinators[1].fetcher
+    assert coordinators[0].data is coordinators[1].data
+
+
+async def test_forced_refresh_downloads_again(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """A recent shared fetch is reused by polls, not by a forced refresh."""
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    await coordinator.async_refresh()
+    assert aioclient_mock.call_count == 1
+    await coordinator.async_force_refresh()
+    assert aioclient_mock.call_count == 2
+
+
+async def test_fetchers_keyed_by_parser(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    pytest.importorskip("ijson")
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    regular = await setup_entry(hass)
+    streaming = await setup_entry(hass, streaming_parser=True)
+
+    assert len(hass.data[SHARED_FETCHERS]) == 2
+    assert aioclient_mock.call_count == 2
+
+    await hass.config_entries.async_unload(streaming.entry_id)
+    assert len(hass.data[SHARED_FETCHERS]) == 1
+    await hass.config_entries.async_unload(regular.entry_id)
+    assert not hass.data[SHARED_FETCHERS]
@@ -0,0 +1,112 @@
+"""Tests for the fuel_estonia setup and services."""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+from unittest.mock import patch
+
+from feedgen import bump_prices, generate
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import entity_registry as er
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker, AiohttpClientMockResponse
+
+from custom_components.fuel_estonia.const import DEFAULT_API, DOMAIN, STORAGE_VERSION
+from custom_components.fuel_estonia.snapshot import build_snapshot
+
+from . import serve_feed, setup_entry
+
+
+async def _force_refresh(hass: HomeAssistant, **data) -> dict:
+    return await hass.services.async_call(DOMAIN, "force_refresh", data, blocking=True, return_response=True)
+
+
+async def test_force_refresh_reports(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass, stations=["1"])
+
+    payload = generate(6, companies=2)
+    bump_prices(payload, 1.0)
+    serve_feed(aioclient_mock, payload)
+    response = await _force_refresh(hass, entry_id=entry.entry_id)
+
+    report = response["entries"][entry.entry_id]
+    assert report["success"] is True
+    assert report["payload_bytes"] > 0
+    assert report["changed_entities"] > 0
+    assert aioclient_mock.call_count == 1
+
+
+async def test_concurrent_force_refreshes_coalesce(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """Calls overlapping a pending forced refresh share its download and report."""
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    with patch.object(coordinator, "async_refresh", wraps=coordinator.async_refresh) as mock_refresh:
+        first, second = await asyncio.gather(_force_refresh(hass), _force_refresh(hass, entry_id=entry.entry_id))
+        assert mock_refresh.call_count == 1
+        assert first == second
+
+        # a later call refreshes again
+        await _force_refresh(hass)
+        assert mock_refresh.call_count == 2
+
+
+async def test_force_refresh_unknown_entry(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    await setup_entry(hass)
+
+    with pytest.raises(HomeAssistantError):
+        await _force_refresh(hass, entry_id="missing")
+    assert aioclient_mock.call_count == 1
+
+
+async def test_setup_downloads_once(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass)
+
+    assert entry.state is ConfigEntryState.LOADED
+    assert aioclient_mock.call_count == 1
+    assert len(hass.data[DOMAIN][entry.entry_id]["coordinator"].data) > 0
+
+
+async def test_setup_from_stored_snapshot(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker, hass_storage: dict[str, Any]
+) -> None:
+    """Sensors come up from the stored snapshot while the first download is still running."""
+    stored = build_snapshot(generate(3, companies=2))
+    entry = MockConfigEntry(domain=DOMAIN, data={"api_url": DEFAULT_API}, options={"stations": ["1", "2", "3"]})
+    hass_storage[f"{DOMAIN}.{entry.entry_id}"] = {
+        "version": STORAGE_VERSION,
+        "minor_version": 1,
+        "key": f"{DOMAIN}.{entry.entry_id}",
+        "data": stored.as_storage(),
+    }
+    release = asyncio.Event()
+
+    async def _slow_feed(method, url, data):
+        await release.wait()
+        return AiohttpClientMockResponse(method, url, json=generate(6, companies=2))
+
+    aioclient_mock.get(DEFAULT_API, side_effect=_slow_feed)
+    entry.add_to_hass(hass)
+    # the first refresh runs in the background, still waiting for the feed
+    async with asyncio.timeout(5):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+
+    station_id, fuel_type_id = key = next(iter(stored.keys()))
+    registry = er.async_get(hass)
+    entity_id = registry.async_get_entity_id("sensor", DOMAIN, f"{entry.entry_id}_{fuel_type_id}_{station_id}")
+    assert hass.states.get(entity_id).state == str(stored.get(key))
+
+    release.set()
+    await hass.async_block_till_done()
+    assert aioclient_mock.call_count == 1
+    fetched = build_snapshot(generate(6, companies=2))
+    assert hass.data[DOMAIN][entry.entry_id]["coordinator"].data == fetched
+    assert hass.states.get(entity_id).state == str(fetched.get(key))
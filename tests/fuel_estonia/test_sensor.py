@@ -0,0 +1,104 @@
+"""Tests for the fuel_estonia entity manager."""
+from __future__ import annotations
+
+from datetime import timedelta
+from unittest.mock import patch
+
+from feedgen import generate
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from custom_components.fuel_estonia.const import DOMAIN
+
+from . import serve_feed, setup_entry
+
+
+def _station_entries(hass: HomeAssistant, entry_id: str, station_id: str) -> list[er.RegistryEntry]:
+    """Registry entries of the price sensors of one station, ``<entry>_<fuel type>_<station>``."""
+    registry = er.async_get(hass)
+    return [
+        reg_entry
+        for reg_entry in er.async_entries_for_config_entry(registry, entry_id)
+        if len(parts := reg_entry.unique_id.split("_")) == 3 and parts[2] == station_id
+    ]
+
+
+async def test_station_sensors_disabled_by_default(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass)
+
+    reg_entries = _station_entries(hass, entry.entry_id, "1")
+    assert reg_entries
+    assert all(reg_entry.disabled_by is er.RegistryEntryDisabler.INTEGRATION for reg_entry in reg_entries)
+
+
+async def test_selecting_station_reregisters_without_reload(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """A selected sensor registered disabled comes back enabled, without reloading the entry."""
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass)
+    disabled = {reg_entry.unique_id: reg_entry.entity_id for reg_entry in _station_entries(hass, entry.entry_id, "1")}
+
+    with patch.object(hass.config_entries, "async_reload") as mock_reload:
+        hass.config_entries.async_update_entry(entry, options={**entry.options, "stations": ["1"]})
+        await hass.async_block_till_done()
+        # the registry's disabled-entity handler reloads after a delay
+        async_fire_time_changed(hass, dt_util.utcnow() + timedelta(minutes=5))
+        await hass.async_block_till_done()
+
+    assert not mock_reload.called
+    reg_entries = _station_entries(hass, entry.entry_id, "1")
+    assert {reg_entry.unique_id: reg_entry.entity_id for reg_entry in reg_entries} == disabled
+    for reg_entry in reg_entries:
+        assert reg_entry.disabled_by is None
+        assert hass.states.get(reg_entry.entity_id) is not None
+    # everything outside the selection is gone
+    assert not _station_entries(hass, entry.entry_id, "2")
+
+
+async def test_deselecting_station_removes_sensors(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass, stations=["1", "2"])
+    entity_ids = [reg_entry.entity_id for reg_entry in _station_entries(hass, entry.entry_id, "2")]
+    assert entity_ids
+
+    hass.config_entries.async_update_entry(entry, options={**entry.options, "stations": ["1"]})
+    await hass.async_block_till_done()
+
+    assert not _station_entries(hass, entry.entry_id, "2")
+    assert all(hass.states.get(entity_id) is None for entity_id in entity_ids)
+    assert _station_entries(hass, entry.entry_id, "1")
+
+
+async def test_new_station_gets_sensors(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """A station showing up in a later feed is picked up without an options change."""
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass, companies=["2"])
+    assert _station_entries(hass, entry.entry_id, "5")
+    assert not _station_entries(hass, entry.entry_id, "7")
+
+    serve_feed(aioclient_mock, generate(7, companies=2))
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+    await coordinator.async_force_refresh()
+    await hass.async_block_till_done()
+
+    # odd stations belong to company 2
+    reg_entries = _station_entries(hass, entry.entry_id, "7")
+    assert reg_entries
+    assert all(reg_entry.disabled_by is None for reg_entry in reg_entries)
+
+
+async def test_other_option_change_reloads(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_feed(aioclient_mock, generate(6, companies=2))
+    entry = await setup_entry(hass)
+
+    with patch.object(hass.config_entries, "async_reload") as mock_reload:
+        hass.config_entries.async_update_entry(entry, options={**entry.options, "companies": ["1"]})
+        await hass.async_block_till_done()
+        assert not mock_reload.called
+
+        hass.config_entries.async_update_entry(entry, options={**entry.options, "update_interval": 600})
+        await hass.async_block_till_done()
+        mock_reload.assert_called_once_with(entry.entry_id)
@@ -0,0 +1,172 @@
+"""Tests for the fuel feed parsers and snapshot diffs."""
+from __future__ import annotations
+
+import json
+import random
+
+from feedgen import VARIANTS, generate
+import pytest
+
+from custom_components.fuel_estonia.snapshot import (
+    FuelSnapshot,
+    PriceDiff,
+    SnapshotParser,
+    build_snapshot,
+    build_snapshot_streaming,
+    diff_snapshots,
+)
+
+
+def _ragged(stations: int) -> dict:
+    """A feed whose first records lack optional keys and later ones spell them differently."""
+    payload = generate(stations)
+    station_list = [station for comp in payload["priceInfo"] for station in comp["stationInfos"]]
+    first = next(station for station in station_list if station["fuelInfos"])
+    del first["latitude"], first["longitude"], first["fuelInfos"][0]["price"]
+    for station in station_list[1::7]:
+        station["Name"] = station.pop("displayName")
+        for fuel in station["fuelInfos"]:
+            if "price" in fuel:
+                fuel["Price"] = fuel.pop("price")
+    return payload
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_compiled_matches_generic(variant: str) -> None:
+    """The compiled extractor agrees with the generic parser on every spelling."""
+    payload = generate(200, variant=variant)
+    parser = SnapshotParser()
+    assert parser.parse(payload) == build_snapshot(payload)
+    assert parser.schema is not None
+    assert parser.parse(payload) == build_snapshot(payload)
+
+
+def test_compiled_matches_generic_on_ragged_feed() -> None:
+    """Missing optional keys and mixed spellings do not change the result."""
+    ragged = _ragged(200)
+    parser = SnapshotParser()
+    assert parser.parse(ragged) == build_snapshot(ragged)
+    # the extractor cached from the uneven feed is reused for the next ones
+    assert parser.schema is not None
+    assert parser.parse(ragged) == build_snapshot(ragged)
+    regular = generate(200)
+    assert parser.parse(regular) == build_snapshot(regular)
+
+
+def test_company_without_stations_keeps_compiled_path() -> None:
+    payload = generate(200)
+    payload["priceInfo"].append({"id": "no-stations"})
+    payload["priceInfo"][0]["stationInfos"][0].pop("id")
+    parser = SnapshotParser()
+    assert parser.parse(payload) == build_snapshot(payload)
+    assert parser.schema is not None
+
+
+def test_flat_feed_with_company_record() -> None:
+    """A company-wrapped record in a flat feed is left to the generic parser."""
+    flat = generate(50, variant="flat")
+    flat.append({"id": 9, "stations": [dict(flat[0], stationId=999)]})
+    parser = SnapshotParser()
+    expected = build_snapshot(flat)
+    assert "999" in expected.stations
+    assert parser.parse(flat) == expected
+    assert parser.parse(flat) == expected
+
+
+@pytest.mark.parametrize("variant", VARIANTS)
+def test_streaming_matches_generic(variant: str) -> None:
+    pytest.importorskip("ijson")
+    payload = generate(200, variant=variant)
+    assert build_snapshot_streaming(json.dumps(payload).encode()) == build_snapshot(payload)
+
+
+def test_streaming_company_after_stations() -> None:
+    """Company ids listed after their stations array still reach the stations."""
+    pytest.importorskip("ijson")
+    payload = generate(200)
+    payload["priceInfo"] = [
+        {key: comp[key] for key in sorted(comp, key=lambda key: key != "stationInfos")}
+        for comp in payload["priceInfo"]
+    ]
+    streamed = build_snapshot_streaming(json.dumps(payload).encode())
+    assert streamed == build_snapshot(payload)
+    assert all(station.company is not None for station in streamed.stations.values())
+
+
+def _naive_diff(old: FuelSnapshot | None, new: FuelSnapshot | None) -> PriceDiff:
+    """Key-by-key reference for ``diff_snapshots``."""
+    old_prices = old if old is not None else FuelSnapshot()
+    new_prices = new if new is not None else FuelSnapshot()
+    diff = PriceDiff()
+    for key, price in new_prices.items():
+        if key not in old_prices:
+            diff.changed[key] = (None, price)
+        elif old_prices.get(key) == price:
+            diff.unchanged += 1
+        else:
+            diff.changed[key] = (old_prices.get(key), price)
+    for key, previous in old_prices.items():
+        if key not in new_prices:
+            diff.changed[key] = (previous, None)
+    return diff
+
+
+def _random_snapshot(rng: random.Random, prices: dict) -> FuelSnapshot:
+    """Build a snapshot from ``{(station_id, fuel_type_id): price}`` in a random layout.
+
+    Stations and their fuels come in shuffled order, and some fuels are
+    listed again after other stations, which puts them outside their
+    station's contiguous rows.
+    """
+    stations: dict[str, list[str]] = {}
+    for sid, fid in prices:
+        stations.setdefault(sid, []).append(fid)
+    order = list(stations)
+    rng.shuffle(order)
+    result = FuelSnapshot()
+    late = []
+    for sid in order:
+        result.add_station(sid, f"Station {sid}")
+        fids = stations[sid]
+        rng.shuffle(fids)
+        for fid in fids:
+            if rng.random() < 0.05:
+                late.append((sid, fid))
+            else:
+                result.add_price(sid, fid, f"Fuel {fid}", prices[(sid, fid)])
+    for sid, fid in late:
+        result.add_price(sid, fid, f"Fuel {fid}", prices[(sid, fid)])
+    return result
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_diff_matches_naive_diff(seed: int) -> None:
+    """``diff_snapshots`` agrees with a key-by-key diff on randomized pairs."""
+    rng = random.Random(seed)
+    for _ in range(300):
+        old_prices = {
+            (str(sid), str(fid)): None if rng.random() < 0.05 else round(rng.uniform(1.4, 2.0), 2)
+            for sid in range(rng.randint(0, 30))
+            for fid in range(1, 6)
+            if rng.random() < 0.8
+        }
+        new_prices = {}
+        for key, price in old_prices.items():
+            roll = rng.random()
+            if roll < 0.05:
+                continue  # disappeared
+            new_prices[key] = (None if rng.random() < 0.3 else round(rng.uniform(1.4, 2.0), 2)) if roll < 0.2 else price
+        for _ in range(rng.randint(0, 5)):
+            new_prices[(str(rng.randint(0, 40)), str(rng.randint(1, 7)))] = round(rng.uniform(1.4, 2.0), 2)
+        old = None if rng.random() < 0.02 else _random_snapshot(rng, old_prices)
+        new = None if rng.random() < 0.02 else _random_snapshot(rng, new_prices)
+        expected, actual = _naive_diff(old, new), diff_snapshots(old, new)
+        assert actual.changed == expected.changed, (old_prices, new_prices)
+        assert actual.unchanged == expected.unchanged, (old_prices, new_prices)
+
+
+def test_diff_of_unchanged_feed_is_empty() -> None:
+    payload = generate(200)
+    diff = diff_snapshots(build_snapshot(payload), build_snapshot(payload))
+    assert not diff.changed
+    assert diff.unchanged == len(build_snapshot(payload))
@@ -0,0 +1,43 @@
+"""Tests for the keskkonnateenused integration."""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from custom_components.keskkonnateenused.const import BASE_API, DOMAIN
+
+CONTRACT = "12345"
+ADDRESS = "Tamme 1, Tartu"
+
+
+def pickups(*garbage: tuple[str, int]) -> dict[str, Any]:
+    """Return a payload with one pickup per ``(garbage type, days from today)``."""
+    today = dt_util.now().date()
+    return {
+        "data": [
+            {"garbage": gtype, "date": (today + timedelta(days=days)).isoformat(), "address": ADDRESS}
+            for gtype, days in garbage
+        ]
+    }
+
+
+def serve_contract(aioclient_mock: AiohttpClientMocker, payload: Any, contract: str = CONTRACT) -> None:
+    """Answer the contract's url with ``payload`` from now on; resets the call count."""
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(f"{BASE_API}{contract}", json=payload)
+
+
+async def setup_entry(hass: HomeAssistant, **options: Any) -> MockConfigEntry:
+    """Add an entry for ``CONTRACT``, set it up and wait for the first refresh."""
+    entry = MockConfigEntry(
+        domain=DOMAIN, version=2, data={"contract_number": CONTRACT, "address": ADDRESS}, options=options
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    return entry
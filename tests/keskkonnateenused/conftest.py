@@ -0,0 +1,12 @@
+"""Fixtures for the keskkonnateenused tests."""
+from __future__ import annotations
+
+import pytest
+
+import custom_components.keskkonnateenused as keskkonnateenused
+
+
+@pytest.fixture(autouse=True)
+def no_force_refresh_delay(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Start forced refreshes right away; calls still overlap within one loop turn."""
+    monkeypatch.setattr(keskkonnateenused, "FORCE_REFRESH_DELAY", 0)
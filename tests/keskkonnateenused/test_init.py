@@ -0,0 +1,80 @@
+"""Tests for the keskkonnateenused setup and services."""
+from __future__ import annotations
+
+import asyncio
+from unittest.mock import patch
+
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+import pytest
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from custom_components.keskkonnateenused.const import DOMAIN, LEGACY_UPDATE_INTERVAL, UPDATE_INTERVAL
+
+from . import CONTRACT, pickups, serve_contract, setup_entry
+
+
+async def _force_refresh(hass: HomeAssistant, **data) -> dict:
+    return await hass.services.async_call(DOMAIN, "force_refresh", data, blocking=True, return_response=True)
+
+
+async def test_force_refresh_counts_changed_and_added(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_contract(aioclient_mock, pickups(("Bio", 3), ("Paber", 5)))
+    entry = await setup_entry(hass)
+
+    serve_contract(aioclient_mock, pickups(("Bio", 2), ("Paber", 5), ("Pakend", 7)))
+    response = await _force_refresh(hass, entry_id=entry.entry_id)
+
+    report = response["entries"][entry.entry_id]
+    assert report["success"] is True
+    assert report["payload_bytes"] > 0
+    # Bio moved, Pakend is new, Paber held
+    assert report["changed_entities"] == 2
+
+
+async def test_concurrent_force_refreshes_coalesce(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """Calls overlapping a pending forced refresh share it and its report."""
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    entry = await setup_entry(hass)
+    coordinator = hass.data[DOMAIN][entry.entry_id]["coordinator"]
+
+    with patch.object(coordinator, "async_refresh", wraps=coordinator.async_refresh) as mock_refresh:
+        first, second = await asyncio.gather(_force_refresh(hass), _force_refresh(hass, entry_id=entry.entry_id))
+        assert mock_refresh.call_count == 1
+        assert first == second
+
+        # a later call refreshes again
+        await _force_refresh(hass)
+        assert mock_refresh.call_count == 2
+
+
+async def test_force_refresh_unknown_entry(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    await setup_entry(hass)
+
+    with pytest.raises(HomeAssistantError):
+        await _force_refresh(hass, entry_id="missing")
+
+
+@pytest.mark.parametrize(
+    ("options", "expected"),
+    [
+        ({"update_interval": LEGACY_UPDATE_INTERVAL}, UPDATE_INTERVAL),
+        ({}, UPDATE_INTERVAL),
+        ({"update_interval": 7200}, 7200),
+    ],
+)
+async def test_migrate_v1_entry(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker, options: dict, expected: int) -> None:
+    """Version 1 entries leave the old hourly default; a custom interval is kept."""
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    entry = MockConfigEntry(domain=DOMAIN, version=1, data={"contract_number": CONTRACT}, options=options)
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert entry.state is ConfigEntryState.LOADED
+    assert entry.version == 2
+    assert entry.options["update_interval"] == expected
@@ -0,0 +1,112 @@
+"""Tests for the keskkonnateenused garbage sensors."""
+from __future__ import annotations
+
+from aiohttp import ClientError
+from homeassistant.const import STATE_UNAVAILABLE
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import entity_registry as er
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import AiohttpClientMocker
+
+from custom_components.keskkonnateenused.const import BASE_API, DOMAIN, SENSOR_REMOVAL_REFRESHES
+
+from . import CONTRACT, pickups, serve_contract, setup_entry
+
+
+def _entity_id(hass: HomeAssistant, entry: MockConfigEntry, gtype: str) -> str | None:
+    return er.async_get(hass).async_get_entity_id("sensor", DOMAIN, f"{entry.entry_id}_Tamme_1_Tartu_{gtype}")
+
+
+def _state(hass: HomeAssistant, entry: MockConfigEntry, gtype: str) -> str | None:
+    entity_id = _entity_id(hass, entry, gtype)
+    state = hass.states.get(entity_id) if entity_id else None
+    return state.state if state else None
+
+
+async def _refresh(hass: HomeAssistant, entry: MockConfigEntry) -> None:
+    await hass.data[DOMAIN][entry.entry_id]["coordinator"].async_refresh()
+    await hass.async_block_till_done()
+
+
+async def test_sensor_per_garbage_type(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_contract(aioclient_mock, pickups(("Bio", 3), ("Paber", 5), ("Paber", 12)))
+    entry = await setup_entry(hass)
+
+    assert _state(hass, entry, "Bio") == "3"
+    assert _state(hass, entry, "Paber") == "5"
+    state = hass.states.get(_entity_id(hass, entry, "Bio"))
+    assert state.attributes["contract_number"] == CONTRACT
+
+
+async def test_new_garbage_type_and_moved_pickup(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    entry = await setup_entry(hass)
+    assert _entity_id(hass, entry, "Pakend") is None
+
+    serve_contract(aioclient_mock, pickups(("Bio", 1), ("Pakend", 7)))
+    await _refresh(hass, entry)
+
+    assert _state(hass, entry, "Bio") == "1"
+    assert _state(hass, entry, "Pakend") == "7"
+
+
+async def test_missing_garbage_type_retired_after_repeated_absence(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """A type missing from the schedule loses its value first and its sensor only later."""
+    serve_contract(aioclient_mock, pickups(("Bio", 3), ("Paber", 5)))
+    entry = await setup_entry(hass)
+
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    for _ in range(SENSOR_REMOVAL_REFRESHES - 1):
+        await _refresh(hass, entry)
+        assert _state(hass, entry, "Paber") == STATE_UNAVAILABLE
+
+    await _refresh(hass, entry)
+    assert _entity_id(hass, entry, "Paber") is None
+    assert _state(hass, entry, "Bio") == "3"
+
+
+async def test_returning_garbage_type_keeps_sensor(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_contract(aioclient_mock, pickups(("Bio", 3), ("Paber", 5)))
+    entry = await setup_entry(hass)
+    entity_id = _entity_id(hass, entry, "Paber")
+
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    for _ in range(SENSOR_REMOVAL_REFRESHES - 1):
+        await _refresh(hass, entry)
+    serve_contract(aioclient_mock, pickups(("Bio", 3), ("Paber", 4)))
+    await _refresh(hass, entry)
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    for _ in range(SENSOR_REMOVAL_REFRESHES - 1):
+        await _refresh(hass, entry)
+
+    assert _entity_id(hass, entry, "Paber") == entity_id
+
+
+async def test_failed_download_does_not_count(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    serve_contract(aioclient_mock, pickups(("Bio", 3), ("Paber", 5)))
+    entry = await setup_entry(hass)
+    hass.data[DOMAIN][entry.entry_id]["fetcher"].attempts = 1
+
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    for _ in range(SENSOR_REMOVAL_REFRESHES - 1):
+        await _refresh(hass, entry)
+    aioclient_mock.clear_requests()
+    aioclient_mock.get(f"{BASE_API}{CONTRACT}", exc=ClientError())
+    await _refresh(hass, entry)
+
+    assert _state(hass, entry, "Paber") == STATE_UNAVAILABLE
+    assert _state(hass, entry, "Bio") == "3"
+
+
+async def test_empty_schedule_clears_sensors(hass: HomeAssistant, aioclient_mock: AiohttpClientMocker) -> None:
+    """An empty reply is applied, not mistaken for a failed download."""
+    serve_contract(aioclient_mock, pickups(("Bio", 3)))
+    entry = await setup_entry(hass)
+
+    serve_contract(aioclient_mock, {"data": []})
+    await _refresh(hass, entry)
+    assert _state(hass, entry, "Bio") == STATE_UNAVAILABLE
+
+    for _ in range(SENSOR_REMOVAL_REFRESHES - 1):
+        await _refresh(hass, entry)
+    assert _entity_id(hass, entry, "Bio") is None